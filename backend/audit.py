@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from fastapi import Depends, Request
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from backend.database import session_for
+from backend.models import AuditEvent, User
+from backend.auth import get_current_user
+
+# Write-behind audit log. Handlers record change events into a bounded in-process
+# buffer and return; a background thread drains it and inserts the events in
+# batches, one transaction per school per batch. When the buffer is full, record()
+# blocks for up to AUDIT_ENQUEUE_TIMEOUT_SECONDS (slowing writers down to the
+# flush rate) before dropping the event. shutdown() flushes whatever is buffered.
+
+AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1"))
+AUDIT_ENQUEUE_TIMEOUT_SECONDS = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT_SECONDS", "2"))
+AUDIT_FLUSH_RETRIES = 3
+
+logger = logging.getLogger(__name__)
+
+# Who made a change; captured when the request starts, before any commit expires the user
+Actor = namedtuple("Actor", ["school", "user_id", "role"])
+
+_buffer = queue.Queue(maxsize=AUDIT_BUFFER_SIZE)
+_STOP = object()
+_writer = None
+_writer_lock = threading.Lock()
+_stats = {"recorded": 0, "written": 0, "dropped": 0, "failed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str, n: int = 1):
+    with _stats_lock:
+        _stats[name] += n
+
+def get_actor(request: Request, current_user: User = Depends(get_current_user)):
+    return Actor(request.state.school, current_user.id, current_user.role)
+
+def record(actor: Actor, action: str, entity_type: str, entity_id: int = None, details: dict = None):
+    _ensure_writer()
+    row = {
+        "created_at": datetime.now(timezone.utc),
+        "actor_id": actor.user_id,
+        "actor_role": actor.role,
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "details": json.dumps(details, default=str) if details else None,
+    }
+    try:
+        _buffer.put((actor.school, row), timeout=AUDIT_ENQUEUE_TIMEOUT_SECONDS)
+    except queue.Full:
+        _count("dropped")
+        logger.warning("Audit buffer full, dropped %s %s %s", action, entity_type, entity_id)
+        return False
+    _count("recorded")
+    return True
+
+def stats():
+    with _stats_lock:
+        return dict(_stats, buffered=_buffer.qsize())
+
+
+# --- Writer ---
+
+def _ensure_writer():
+    global _writer
+    if _writer is None or not _writer.is_alive():
+        with _writer_lock:
+            if _writer is None or not _writer.is_alive():
+                _writer = threading.Thread(target=_write_loop, name="audit-writer", daemon=True)
+                _writer.start()
+
+def _write_loop():
+    stopping = False
+    while not stopping:
+        item = _buffer.get()
+        if item is _STOP:
+            break
+        batch = [item]
+        # Gather for up to one flush interval so quiet periods still write in batches
+        deadline = time.monotonic() + AUDIT_FLUSH_INTERVAL_SECONDS
+        while len(batch) < AUDIT_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = _buffer.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stopping = True
+                break
+            batch.append(item)
+        _flush(batch)
+
+def _flush(batch):
+    by_school = {}
+    for school, row in batch:
+        by_school.setdefault(school, []).append(row)
+    for school, rows in by_school.items():
+        for attempt in range(1, AUDIT_FLUSH_RETRIES + 1):
+            try:
+                with session_for(school) as db:
+                    db.execute(insert(AuditEvent), rows)
+                    db.commit()
+                _count("written", len(rows))
+                break
+            except Exception:
+                if attempt == AUDIT_FLUSH_RETRIES:
+                    _count("failed", len(rows))
+                    logger.exception("Could not write %d audit events for school %s", len(rows), school)
+                else:
+                    time.sleep(0.5 * attempt)
+
+def shutdown(timeout: float = 30):
+    # Everything queued before the stop marker is flushed before the writer exits
+    if _writer is not None and _writer.is_alive():
+        _buffer.put(_STOP)
+        _writer.join(timeout)
+
+
+# --- Queries ---
+
+def query_events(db: Session, actor_id: int = None, entity_type: str = None, entity_id: int = None,
+                 since: datetime = None, until: datetime = None, before_id: int = None, limit: int = 100):
+    # Newest first; before_id pages backwards. Each filter combination has a matching
+    # (actor_id, created_at) / (entity_type, entity_id, created_at) / created_at index.
+    query = db.query(AuditEvent)
+    if actor_id is not None:
+        query = query.filter(AuditEvent.actor_id == actor_id)
+    if entity_type is not None:
+        query = query.filter(AuditEvent.entity_type == entity_type)
+    if entity_id is not None:
+        query = query.filter(AuditEvent.entity_id == entity_id)
+    if since is not None:
+        query = query.filter(AuditEvent.created_at >= since)
+    if until is not None:
+        query = query.filter(AuditEvent.created_at < until)
+    if before_id is not None:
+        query = query.filter(AuditEvent.id < before_id)
+    return query.order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc()).limit(limit).all()
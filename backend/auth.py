@@ -3,10 +3,11 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select, lambda_stmt
 from sqlalchemy.orm import Session
-from backend.database import get_db
+from backend.database import session_for, DEFAULT_SCHOOL
 from backend.models import User
 from dotenv import load_dotenv
 
@@ -15,6 +16,11 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "b107c134808c4e463a510f8dfeb3c3cf6c820d8856a2bb0331ccb3df829b46e3")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+# Short-lived tokens handed to the browser so analytics pages can call the API
+# directly; they only work for GET requests under /api/analytics
+BROWSER_TOKEN_EXPIRE_SECONDS = int(os.getenv("BROWSER_TOKEN_EXPIRE_SECONDS", "300"))
+BROWSER_TOKEN_SCOPE = "analytics"
+BROWSER_TOKEN_PATH_PREFIX = "/api/analytics"
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
@@ -35,14 +41,50 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_browser_token(user: User, school: str):
+    return create_access_token(
+        data={"sub": user.email, "role": user.role, "school": school, "scope": BROWSER_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=BROWSER_TOKEN_EXPIRE_SECONDS),
+    )
+
+def request_token(request: Request):
+    # EventSource cannot send headers, so streaming endpoints also accept ?access_token=
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        return auth_header[len("Bearer "):]
+    return request.query_params.get("access_token")
+
+def token_payload(request: Request):
+    token = request_token(request)
+    if token:
+        try:
+            return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            pass
+    return None
+
+def resolve_school(request: Request, payload: Optional[dict] = None):
+    # Signed tokens carry the school they were issued for. The X-School header is
+    # only consulted for unauthenticated requests such as the login itself.
+    if payload:
+        return payload.get("school") or DEFAULT_SCHOOL
+    return request.headers.get("X-School") or DEFAULT_SCHOOL
+
 # --- Dependencies ---
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def user_by_email(db: Session, email: str):
+    # Runs on every authenticated request. A lambda statement is built and compiled
+    # once; later calls only re-bind the email.
+    return db.execute(lambda_stmt(lambda: select(User).where(User.email == email).limit(1))).scalars().first()
+
+def _user_from_token(token: Optional[str], db: Session, request: Request):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -50,11 +92,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == email).first()
+    if payload.get("scope") == BROWSER_TOKEN_SCOPE and not (
+        request.method == "GET" and request.url.path.startswith(BROWSER_TOKEN_PATH_PREFIX)
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="This token only grants read access to analytics")
+    user = user_by_email(db, email)
     if user is None:
         raise credentials_exception
     return user
 
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
+    # Own short-lived session, closed once the user is loaded: read endpoints open a
+    # second (replica) session, and the request must not hold two pooled connections
+    with session_for(getattr(request.state, "school", DEFAULT_SCHOOL), getattr(request.state, "query_scope", None)) as db:
+        return _user_from_token(token, db, request)
+
+def get_stream_user(request: Request):
+    # Own short-lived session: a get_db session would stay open for the whole stream
+    with session_for(request.state.school) as db:
+        return _user_from_token(request_token(request), db, request)
+
 
 async def get_current_admin(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
@@ -1,13 +1,18 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from backend.models import User, Student, Teacher, Subject, Mark
-from backend.schemas import UserCreate, StudentCreate, TeacherCreate, SubjectCreate, MarkCreate, MarkUpdate
-from backend.auth import get_password_hash
+from sqlalchemy.orm import Session, joinedload, contains_eager
+from sqlalchemy import func, desc, select, insert, update, delete, exists, literal, and_, or_, case, union, bindparam, lambda_stmt, Integer, Numeric
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from backend.models import User, Student, Teacher, Subject, Mark, Enrollment, ArchivedMark
+from backend.schemas import UserCreate, StudentCreate, TeacherCreate, SubjectCreate, MarkCreate, MarkUpdate, EnrollmentCreate
+from backend.schemas import Mark as MarkSchema
+from backend.auth import get_password_hash, user_by_email
+from backend.database import school_of
+from backend import singleflight
 
 # --- Users ---
 
 def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+    return user_by_email(db, email)
 
 # --- Admin Operations ---
 
@@ -52,6 +57,50 @@ def admin_create_student(db: Session, student: StudentCreate):
 def admin_get_all_students(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Student).offset(skip).limit(limit).all()
 
+# --- Sparse Fieldsets ---
+# Allowed ?fields= paths per list endpoint, mapped to the column that serves each one.
+# Joins are only added when a field from the joined table is requested.
+
+STUDENT_FIELD_COLUMNS = {
+    "id": Student.id,
+    "user_id": Student.user_id,
+    "class_name": Student.class_name,
+    "roll_number": Student.roll_number,
+    "user.name": User.name,
+    "user.email": User.email,
+    "user.role": User.role,
+}
+
+MARK_FIELD_COLUMNS = {
+    "id": Mark.id,
+    "marks": Mark.marks,
+    "student_id": Mark.student_id,
+    "subject_id": Mark.subject_id,
+    "created_at": Mark.created_at,
+    "subject.id": Subject.id,
+    "subject.name": Subject.name,
+    "subject.teacher_id": Subject.teacher_id,
+    "student.id": Student.id,
+    "student.user_id": Student.user_id,
+    "student.class_name": Student.class_name,
+    "student.roll_number": Student.roll_number,
+    "student.user.name": User.name,
+    "student.user.email": User.email,
+    "student.user.role": User.role,
+}
+
+def _needs(fields, prefix: str):
+    return any(f.startswith(prefix) for f in fields)
+
+def _student_fields_query(db: Session, fields):
+    query = db.query(*[STUDENT_FIELD_COLUMNS[f] for f in fields]).select_from(Student)
+    if _needs(fields, "user."):
+        query = query.join(User, User.id == Student.user_id)
+    return query
+
+def admin_get_student_fields(db: Session, fields, skip: int = 0, limit: int = 100):
+    return _student_fields_query(db, fields).offset(skip).limit(limit).all()
+
 def admin_get_all_teachers(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Teacher).offset(skip).limit(limit).all()
 
@@ -76,49 +125,303 @@ def admin_get_all_subjects(db: Session):
 def admin_get_all_marks(db: Session):
     return db.query(Mark).all()
 
+# --- Enrollments ---
+
+def admin_enroll_student(db: Session, enrollment: EnrollmentCreate):
+    db_enrollment = Enrollment(**enrollment.model_dump())
+    db.add(db_enrollment)
+    db.commit()
+    db.refresh(db_enrollment)
+    return db_enrollment
+
+def _upsert_insert(db: Session, model):
+    # INSERT supporting ON CONFLICT for the session's dialect (PostgreSQL or SQLite)
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert(model)
+    return postgresql_insert(model)
+
+def admin_enroll_class(db: Session, class_name: str, subject_id: int):
+    # Enroll a whole class section in one INSERT ... SELECT, skipping students already enrolled
+    source = select(Student.id, literal(subject_id)).where(Student.class_name == class_name)
+    stmt = _upsert_insert(db, Enrollment)\
+        .from_select(["student_id", "subject_id"], source)\
+        .on_conflict_do_nothing(index_elements=["student_id", "subject_id"])
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount
+
+def backfill_enrollments(db: Session):
+    # Upgrade path for databases from before enrollments existed: every student with a
+    # mark in a subject is enrolled in it. Only runs while the table is still empty,
+    # so later unenrollments are not undone on restart.
+    source = select(Mark.student_id, Mark.subject_id).distinct()\
+        .where(~select(Enrollment.id).exists())
+    stmt = _upsert_insert(db, Enrollment)\
+        .from_select(["student_id", "subject_id"], source)\
+        .on_conflict_do_nothing(index_elements=["student_id", "subject_id"])
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount
+
+def admin_get_subject_enrollments(db: Session, subject_id: int):
+    return db.query(Enrollment).filter(Enrollment.subject_id == subject_id).all()
+
+def admin_delete_enrollment(db: Session, enrollment_id: int):
+    deleted = db.query(Enrollment).filter(Enrollment.id == enrollment_id).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+# --- Bulk Delete & Archival ---
+# Everything below runs as set-based statements. Dependent marks and enrollments are
+# removed by the ON DELETE CASCADE foreign keys, so nothing is loaded into the session.
+# Results carry "deleted_ids", the ids actually removed (via RETURNING), for auditing.
+
+def _count(db: Session, column, *criteria):
+    return db.query(func.count(column)).filter(*criteria).scalar()
+
+def _student_criteria(ids=None, class_name=None):
+    if ids:
+        return Student.id.in_(ids)
+    if class_name:
+        return Student.class_name == class_name
+    raise ValueError("Provide student ids or a class_name")
+
+def _archive_marks(db: Session, *criteria):
+    source = select(
+        Mark.student_id, User.name, Student.roll_number, Student.class_name,
+        Mark.subject_id, Subject.name, Mark.marks, Mark.created_at
+    ).join(Student, Student.id == Mark.student_id)\
+     .join(User, User.id == Student.user_id)\
+     .join(Subject, Subject.id == Mark.subject_id)\
+     .where(*criteria)
+    columns = ["student_id", "student_name", "roll_number", "class_name",
+               "subject_id", "subject_name", "marks", "created_at"]
+    return db.execute(insert(ArchivedMark).from_select(columns, source)).rowcount
+
+def _delete_students(db: Session, criteria, archive: bool = False):
+    student_ids = select(Student.id).where(criteria)
+    result = {
+        "marks": _count(db, Mark.id, Mark.student_id.in_(student_ids)),
+        "enrollments": _count(db, Enrollment.id, Enrollment.student_id.in_(student_ids)),
+    }
+    if archive:
+        result["archived_marks"] = _archive_marks(db, Mark.student_id.in_(student_ids))
+    # Deleting the login cascades to the student profile and from there to marks and enrollments
+    students = db.execute(select(Student.id, Student.user_id).where(criteria)).all()
+    user_ids = select(Student.user_id).where(criteria)
+    stmt = delete(User).where(User.id.in_(user_ids)).returning(User.id).execution_options(synchronize_session=False)
+    deleted_users = set(db.scalars(stmt))
+    result["deleted_ids"] = [student_id for student_id, user_id in students if user_id in deleted_users]
+    result["students"] = len(result["deleted_ids"])
+    db.commit()
+    return result
+
+def admin_bulk_delete_students(db: Session, ids=None, class_name=None):
+    return _delete_students(db, _student_criteria(ids, class_name))
+
+def admin_archive_students(db: Session, ids=None, class_name=None):
+    return _delete_students(db, _student_criteria(ids, class_name), archive=True)
+
+def admin_bulk_delete_teachers(db: Session, ids):
+    # subjects.teacher_id is ON DELETE SET NULL, so their subjects and marks are kept
+    teachers = db.execute(select(Teacher.id, Teacher.user_id).where(Teacher.id.in_(ids))).all()
+    user_ids = select(Teacher.user_id).where(Teacher.id.in_(ids))
+    stmt = delete(User).where(User.id.in_(user_ids)).returning(User.id).execution_options(synchronize_session=False)
+    deleted_users = set(db.scalars(stmt))
+    deleted_ids = [teacher_id for teacher_id, user_id in teachers if user_id in deleted_users]
+    db.commit()
+    return {"teachers": len(deleted_ids), "deleted_ids": deleted_ids}
+
+def _delete_subjects(db: Session, ids, archive: bool = False):
+    result = {
+        "marks": _count(db, Mark.id, Mark.subject_id.in_(ids)),
+        "enrollments": _count(db, Enrollment.id, Enrollment.subject_id.in_(ids)),
+    }
+    if archive:
+        result["archived_marks"] = _archive_marks(db, Mark.subject_id.in_(ids))
+    stmt = delete(Subject).where(Subject.id.in_(ids)).returning(Subject.id).execution_options(synchronize_session=False)
+    result["deleted_ids"] = list(db.scalars(stmt))
+    result["subjects"] = len(result["deleted_ids"])
+    db.commit()
+    return result
+
+def admin_bulk_delete_subjects(db: Session, ids):
+    return _delete_subjects(db, ids)
+
+def admin_archive_subjects(db: Session, ids):
+    return _delete_subjects(db, ids, archive=True)
+
+def _can_grade(teacher_user_id: int, student_id, subject_id):
+    # Ownership as a correlated EXISTS, so it can be embedded in the write statement:
+    # the subject is taught by this teacher and the student is enrolled in it
+    return exists().where(
+        Subject.id == subject_id,
+        Teacher.id == Subject.teacher_id,
+        Teacher.user_id == teacher_user_id,
+        Enrollment.subject_id == Subject.id,
+        Enrollment.student_id == student_id,
+    )
+
 # --- Teacher Operations ---
 
 def teacher_get_my_subjects(db: Session, teacher_user_id: int):
-    teacher = db.query(Teacher).filter(Teacher.user_id == teacher_user_id).first()
-    if not teacher: return []
-    return db.query(Subject).filter(Subject.teacher_id == teacher.id).all()
+    stmt = lambda_stmt(lambda: select(Subject).join(Teacher, Teacher.id == Subject.teacher_id).where(Teacher.user_id == teacher_user_id))
+    return db.execute(stmt).scalars().all()
+
+def _teacher_enrolled_student_ids(teacher_user_id: int):
+    return select(Enrollment.student_id)\
+        .join(Subject, Subject.id == Enrollment.subject_id)\
+        .join(Teacher, Teacher.id == Subject.teacher_id)\
+        .where(Teacher.user_id == teacher_user_id)
 
 def teacher_get_my_students(db: Session, teacher_user_id: int):
-    # Teachers can view students who have marks in their subjects, 
-    # OR potentially all students if they need to add marks. For now, return all students 
-    # so they can grade them in their assigned classes.
-    return db.query(Student).all()
+    # Only students enrolled in one of the teacher's subjects, walked from the
+    # teacher side so the cost follows class size rather than school size
+    return db.query(Student)\
+        .options(joinedload(Student.user))\
+        .filter(Student.id.in_(_teacher_enrolled_student_ids(teacher_user_id)))\
+        .order_by(Student.class_name, Student.roll_number)\
+        .all()
+
+def teacher_get_my_student_fields(db: Session, teacher_user_id: int, fields):
+    return _student_fields_query(db, fields)\
+        .filter(Student.id.in_(_teacher_enrolled_student_ids(teacher_user_id)))\
+        .order_by(Student.class_name, Student.roll_number)\
+        .all()
+
+# --- Roster Search ---
+# Typeahead over student name, email and roll number. Prefix matches use the lower()
+# expression indexes; from SEARCH_FUZZY_MIN_LENGTH characters on, substring matches
+# (and on PostgreSQL trigram similarity) widen the net. Ranking: exact roll number,
+# then prefix matches, then the rest by similarity, then name.
+
+SEARCH_FUZZY_MIN_LENGTH = 3
+
+def _like_escape(value: str):
+    return value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+def _prefix_match(dialect: str, column, term: str):
+    lowered = func.lower(column)
+    if dialect == "sqlite":
+        # SQLite only uses an expression index for a range, never for LIKE
+        return and_(lowered >= term, lowered < term + "\U0010ffff")
+    return lowered.like(_like_escape(term) + "%", escape="/")
+
+def _fuzzy_match(dialect: str, column, term: str):
+    if dialect == "postgresql":
+        # Both forms are answered by the gin_trgm_ops index on the column
+        return or_(column.ilike(f"%{_like_escape(term)}%", escape="/"), column.op("%")(term))
+    return func.instr(func.lower(column), term) > 0
+
+def _search_match(dialect: str, columns, term: str):
+    criteria = [_prefix_match(dialect, column, term) for column in columns]
+    if len(term) >= SEARCH_FUZZY_MIN_LENGTH:
+        criteria += [_fuzzy_match(dialect, column, term) for column in columns]
+    return or_(*criteria)
+
+def teacher_search_students(db: Session, teacher_user_id: int, q: str, subject_id: int = None, limit: int = 20):
+    term = q.strip().lower()
+    if not term:
+        return []
+    dialect = db.get_bind().dialect.name
+    # One branch per table so each side's ORed conditions can combine its own indexes
+    matches = union(
+        select(Student.id).join(User, User.id == Student.user_id).where(_search_match(dialect, (User.name, User.email), term)),
+        select(Student.id).where(_search_match(dialect, (Student.roll_number,), term)),
+    )
+    enrolled = _teacher_enrolled_student_ids(teacher_user_id)
+    if subject_id:
+        enrolled = enrolled.where(Enrollment.subject_id == subject_id)
+
+    prefix = or_(*[_prefix_match(dialect, column, term) for column in (User.name, User.email, Student.roll_number)])
+    tier = case((func.lower(Student.roll_number) == term, 0), (prefix, 1), else_=2)
+    if dialect == "postgresql":
+        similarity = func.greatest(*[func.similarity(column, term) for column in (User.name, User.email, Student.roll_number)])
+    else:
+        similarity = literal(0)
+
+    return db.query(Student)\
+        .join(Student.user)\
+        .options(contains_eager(Student.user))\
+        .filter(Student.id.in_(matches), Student.id.in_(enrolled))\
+        .order_by(tier, desc(similarity), User.name, Student.roll_number)\
+        .limit(limit)\
+        .all()
+
+# Mark writes are single statements: the ownership check runs inside the INSERT /
+# UPDATE / DELETE and RETURNING hands back the row, so a successful write is one
+# round trip. Only the failure paths look further to pick the right error. The
+# returned row is captured as a schema before commit, which would expire it and
+# force a reload.
+# The statements are built once at import with named parameters, so a write only
+# binds values: no per-call construction, and the compiled SQL is always a cache hit.
+
+_p_teacher_user_id = bindparam("teacher_user_id", type_=Integer)
+_p_student_id = bindparam("grade_student_id", type_=Integer)
+_p_subject_id = bindparam("grade_subject_id", type_=Integer)
+_p_marks = bindparam("grade_marks", type_=Numeric(5, 2))
+_p_mark_id = bindparam("mark_id", type_=Integer)
+
+_CREATE_MARK = insert(Mark)\
+    .from_select(
+        ["student_id", "subject_id", "marks"],
+        select(_p_student_id, _p_subject_id, _p_marks).where(_can_grade(_p_teacher_user_id, _p_student_id, _p_subject_id)),
+    )\
+    .returning(Mark)\
+    .execution_options(dml_strategy="orm")
+
+_UPDATE_MARK = update(Mark)\
+    .where(Mark.id == _p_mark_id, _can_grade(_p_teacher_user_id, Mark.student_id, Mark.subject_id))\
+    .values(marks=_p_marks)\
+    .returning(Mark)\
+    .execution_options(synchronize_session=False)
+
+_DELETE_MARK = delete(Mark)\
+    .where(Mark.id == _p_mark_id, _can_grade(_p_teacher_user_id, Mark.student_id, Mark.subject_id))\
+    .returning(Mark.id)\
+    .execution_options(synchronize_session=False)
+
+def _mark_exists(db: Session, mark_id: int):
+    return db.execute(lambda_stmt(lambda: select(exists().where(Mark.id == mark_id)))).scalar()
 
 def teacher_create_mark(db: Session, mark: MarkCreate, teacher_user_id: int):
-    teacher = db.query(Teacher).filter(Teacher.user_id == teacher_user_id).first()
-    if not teacher: raise ValueError("Teacher profile not found")
-    
-    # Verify the teacher owns this subject
-    subject = db.query(Subject).filter(Subject.id == mark.subject_id, Subject.teacher_id == teacher.id).first()
-    if not subject:
-        raise ValueError("You are not assigned to teach this subject.")
-        
-    db_mark = Mark(**mark.model_dump())
-    db.add(db_mark)
+    params = {
+        "teacher_user_id": teacher_user_id,
+        "grade_student_id": mark.student_id,
+        "grade_subject_id": mark.subject_id,
+        "grade_marks": mark.marks,
+    }
+    db_mark = db.scalars(_CREATE_MARK, params).first()
+    if not db_mark:
+        db.rollback()
+        raise ValueError("You are not assigned to teach this subject, or the student is not enrolled in it.")
+    result = MarkSchema.model_validate(db_mark)
     db.commit()
-    db.refresh(db_mark)
-    return db_mark
+    return result
 
 def teacher_update_mark(db: Session, mark_id: int, mark_update: MarkUpdate, teacher_user_id: int):
-    teacher = db.query(Teacher).filter(Teacher.user_id == teacher_user_id).first()
-    
-    db_mark = db.query(Mark).filter(Mark.id == mark_id).first()
-    if not db_mark: return None
-    
-    # Verify ownership
-    subject = db.query(Subject).filter(Subject.id == db_mark.subject_id, Subject.teacher_id == teacher.id).first()
-    if not subject:
-        raise ValueError("You are not assigned to teach this subject.")
-        
-    db_mark.marks = mark_update.marks
+    params = {"mark_id": mark_id, "teacher_user_id": teacher_user_id, "grade_marks": mark_update.marks}
+    db_mark = db.scalars(_UPDATE_MARK, params).first()
+    if not db_mark:
+        db.rollback()
+        if not _mark_exists(db, mark_id):
+            return None
+        raise ValueError("You are not assigned to teach this student in this subject.")
+    result = MarkSchema.model_validate(db_mark)
     db.commit()
-    db.refresh(db_mark)
-    return db_mark
+    return result
+
+def teacher_delete_mark(db: Session, mark_id: int, teacher_user_id: int):
+    # Same outcomes as teacher_update_mark: True when deleted, None when there is no
+    # such mark, ValueError when it belongs to someone else
+    deleted = db.execute(_DELETE_MARK, {"mark_id": mark_id, "teacher_user_id": teacher_user_id}).first()
+    if not deleted:
+        db.rollback()
+        if not _mark_exists(db, mark_id):
+            return None
+        raise ValueError("Not authorized to delete this record")
+    db.commit()
+    return True
 
 # --- Student Operations ---
 
@@ -130,6 +433,18 @@ def student_get_my_marks(db: Session, student_user_id: int):
     if not student: return []
     return db.query(Mark).filter(Mark.student_id == student.id).all()
 
+def student_get_my_mark_fields(db: Session, student_user_id: int, fields):
+    # One query: the student join doubles as the ownership filter
+    query = db.query(*[MARK_FIELD_COLUMNS[f] for f in fields])\
+        .select_from(Mark)\
+        .join(Student, Student.id == Mark.student_id)\
+        .filter(Student.user_id == student_user_id)
+    if _needs(fields, "subject."):
+        query = query.join(Subject, Subject.id == Mark.subject_id)
+    if _needs(fields, "student.user."):
+        query = query.join(User, User.id == Student.user_id)
+    return query.all()
+
 
 # --- Analytics (Admin) ---
 
@@ -149,6 +464,13 @@ def get_leaderboard(db: Session):
         for r in results
     ]
 
+def shared_leaderboard(db: Session):
+    # Coalesced across concurrent requests reading the same database (see singleflight).
+    # Primary and replica reads never share a result, so a primary read still sees
+    # its own school's latest commits.
+    key = (school_of(db), "replica" if db.info.get("replica") else "primary")
+    return singleflight.run("leaderboard", key, lambda: get_leaderboard(db))
+
 def get_subject_averages(db: Session):
     results = db.query(
         Subject.name,
@@ -160,17 +482,36 @@ def get_subject_averages(db: Session):
     return [{"subject_name": r[0], "average_marks": round(float(r[1]), 2)} for r in results]
 
 
+def get_school_summary(db: Session):
+    # Per-school totals for cross-school aggregation; subject sums/counts (not averages)
+    # so the caller can combine them exactly across schools
+    students = db.query(func.count(Student.id)).scalar()
+    teachers = db.query(func.count(Teacher.id)).scalar()
+    mark_count, mark_sum = db.query(func.count(Mark.id), func.sum(Mark.marks)).one()
+    subject_totals = db.query(Subject.name, func.sum(Mark.marks), func.count(Mark.id))\
+        .join(Mark, Subject.id == Mark.subject_id)\
+        .group_by(Subject.name)\
+        .all()
+    return {
+        "students": students,
+        "teachers": teachers,
+        "marks": mark_count,
+        "average_marks": round(float(mark_sum) / mark_count, 2) if mark_count else None,
+        "subject_totals": [(name, float(total), count) for name, total, count in subject_totals],
+    }
+
+
 # --- Analytics (Teacher) ---
 
 def teacher_get_subject_averages(db: Session, teacher_user_id: int):
-    teacher = db.query(Teacher).filter(Teacher.user_id == teacher_user_id).first()
-    if not teacher: return []
-    
+    # Averages over the teacher's enrolled students only
     results = db.query(
         Subject.name,
         func.avg(Mark.marks).label('average_marks')
-    ).join(Mark, Subject.id == Mark.subject_id)\
-     .filter(Subject.teacher_id == teacher.id)\
+    ).join(Teacher, Teacher.id == Subject.teacher_id)\
+     .join(Enrollment, Enrollment.subject_id == Subject.id)\
+     .join(Mark, and_(Mark.subject_id == Subject.id, Mark.student_id == Enrollment.student_id))\
+     .filter(Teacher.user_id == teacher_user_id)\
      .group_by(Subject.name)\
      .all()
      
@@ -178,6 +519,10 @@ def teacher_get_subject_averages(db: Session, teacher_user_id: int):
 
 # --- Analytics (Student) ---
 def student_get_my_stats(db: Session, student_user_id: int):
+    # Leaderboard first: a request waiting on a shared computation has not touched its
+    # session yet, and the auth lookup closed its own session before the handler ran
+    # (see get_current_user), so a waiter holds no pooled connection
+    lb = shared_leaderboard(db)
     student = student_get_my_profile(db, student_user_id)
     if not student: return None
     
@@ -186,7 +531,6 @@ def student_get_my_stats(db: Session, student_user_id: int):
     own_avg = round(float(avg_result), 2) if avg_result else 0.0
     
     # Calc rank (simple in-memory sort)
-    lb = get_leaderboard(db)
     rank = 0
     percentile = 0.0
     for i, entry in enumerate(lb):
@@ -204,3 +548,57 @@ def student_get_my_stats(db: Session, student_user_id: int):
         "percentile": round(percentile, 2)
     }
 
+# --- Report Cards ---
+
+def get_class_report_data(db: Session, class_name: str):
+    # Three set-based queries for the whole class: roster with averages and class rank,
+    # every mark, and per-subject class averages. Assembled into plain dicts for rendering.
+    average = func.avg(Mark.marks)
+    roster = db.query(
+        Student.id,
+        User.name,
+        Student.roll_number,
+        average.label('average_marks'),
+        func.rank().over(order_by=average.desc().nullslast()).label('rank')
+    ).join(User, Student.user_id == User.id)\
+     .outerjoin(Mark, Student.id == Mark.student_id)\
+     .filter(Student.class_name == class_name)\
+     .group_by(Student.id, User.name, Student.roll_number)\
+     .order_by(Student.roll_number)\
+     .all()
+
+    marks = db.query(Mark.student_id, Subject.name, Mark.marks)\
+        .join(Subject, Subject.id == Mark.subject_id)\
+        .join(Student, Student.id == Mark.student_id)\
+        .filter(Student.class_name == class_name)\
+        .order_by(Subject.name)\
+        .all()
+
+    subject_averages = db.query(Subject.name, func.avg(Mark.marks))\
+        .join(Mark, Subject.id == Mark.subject_id)\
+        .join(Student, Student.id == Mark.student_id)\
+        .filter(Student.class_name == class_name)\
+        .group_by(Subject.name)\
+        .all()
+    class_averages = {name: round(float(avg), 2) for name, avg in subject_averages}
+
+    cards = {
+        r[0]: {
+            "student_id": r[0],
+            "student_name": r[1],
+            "roll_number": r[2],
+            "class_name": class_name,
+            "average_marks": round(float(r[3]), 2) if r[3] is not None else None,
+            "rank": r[4] if r[3] is not None else None,
+            "class_size": len(roster),
+            "subjects": [],
+        }
+        for r in roster
+    }
+    for student_id, subject_name, value in marks:
+        cards[student_id]["subjects"].append({
+            "subject_name": subject_name,
+            "marks": float(value),
+            "class_average": class_averages.get(subject_name),
+        })
+    return list(cards.values())
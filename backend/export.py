@@ -0,0 +1,201 @@
+import argparse
+import os
+import shutil
+import tempfile
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from backend.database import read_session_for, QueryScope
+from backend.models import User, Student, Subject, Mark
+from backend import crud
+
+# Columnar export of marks (Arrow IPC stream / Parquet). Rows are read from a
+# server-side cursor in batches and converted batch by batch, so memory stays
+# bounded by EXPORT_BATCH_SIZE regardless of the table size.
+# pyarrow is imported lazily so the API runs without it; only exports need it.
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "50000"))
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+MARK_EXPORT_COLUMNS = [
+    ("mark_id", Mark.id),
+    ("student_id", Student.id),
+    ("roll_number", Student.roll_number),
+    ("student_name", User.name),
+    ("class_name", Student.class_name),
+    ("subject_id", Subject.id),
+    ("subject_name", Subject.name),
+    ("marks", Mark.marks),
+    ("created_at", Mark.created_at),
+]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.dataset
+    except ImportError:
+        raise RuntimeError("Columnar export requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+def mark_schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ("mark_id", pa.int32()),
+        ("student_id", pa.int32()),
+        ("roll_number", pa.string()),
+        ("student_name", pa.string()),
+        ("class_name", pa.string()),
+        ("subject_id", pa.int32()),
+        ("subject_name", pa.string()),
+        ("marks", pa.decimal128(5, 2)),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+    ])
+
+def iter_mark_batches(db: Session, class_name: str = None, subject_id: int = None, batch_size: int = EXPORT_BATCH_SIZE):
+    pa = _pyarrow()
+    schema = mark_schema()
+    stmt = select(*[column for _, column in MARK_EXPORT_COLUMNS])\
+        .select_from(Mark)\
+        .join(Student, Student.id == Mark.student_id)\
+        .join(User, User.id == Student.user_id)\
+        .join(Subject, Subject.id == Mark.subject_id)
+    if class_name:
+        stmt = stmt.where(Student.class_name == class_name)
+    if subject_id:
+        stmt = stmt.where(Subject.id == subject_id)
+    stmt = stmt.order_by(Student.class_name, Subject.name, Mark.id)
+
+    result = db.execute(stmt, execution_options={"stream_results": True, "yield_per": batch_size})
+    for rows in result.partitions():
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        )
+
+
+# --- Writers ---
+
+class _ChunkSink:
+    # Write-only file object that hands written bytes back to a generator
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _open_writer(pa, fmt: str, sink, schema):
+    if fmt == "parquet":
+        return pa.parquet.ParquetWriter(sink, schema, compression="zstd")
+    return pa.ipc.new_stream(sink, schema)
+
+def stream_marks(school: str, fmt: str = "arrow", class_name: str = None, subject_id: int = None, query_scope: QueryScope = None):
+    # Generator of encoded bytes for a StreamingResponse. Opens its own session because
+    # it keeps running after the request's dependencies have been torn down.
+    pa = _pyarrow()
+    sink = _ChunkSink()
+    with read_session_for(school, query_scope=query_scope) as db:
+        writer = _open_writer(pa, fmt, pa.PythonFile(sink, mode="w"), mark_schema())
+        for batch in iter_mark_batches(db, class_name=class_name, subject_id=subject_id):
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+        writer.close()
+    yield sink.drain()
+
+def write_marks(db: Session, path: str, fmt: str = "parquet", class_name: str = None, subject_id: int = None):
+    pa = _pyarrow()
+    rows = 0
+    with pa.OSFile(path, "wb") as sink:
+        writer = _open_writer(pa, fmt, sink, mark_schema())
+        for batch in iter_mark_batches(db, class_name=class_name, subject_id=subject_id):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+        writer.close()
+    return rows
+
+SNAPSHOT_ENTRIES = {"marks", "leaderboard.parquet", "subject_averages.parquet"}
+
+def write_snapshot(db: Session, base_dir: str):
+    # Hive-partitioned marks dataset (class_name=.../subject_name=.../*.parquet) plus
+    # the leaderboard and subject averages as small side tables. Written to a fresh
+    # staging directory and swapped in, so re-using a path (snapshots/latest) replaces
+    # the old snapshot whole: partitions of deleted classes or subjects do not linger.
+    pa = _pyarrow()
+    base_dir = os.path.normpath(base_dir)
+    if os.path.exists(base_dir) and not set(os.listdir(base_dir)) <= SNAPSHOT_ENTRIES:
+        raise FileExistsError(f"{base_dir} exists and is not a snapshot directory")
+    os.makedirs(os.path.dirname(base_dir) or ".", exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=os.path.basename(base_dir) + ".", dir=os.path.dirname(base_dir) or ".")
+    try:
+        reader = pa.RecordBatchReader.from_batches(mark_schema(), iter_mark_batches(db))
+        pa.dataset.write_dataset(
+            reader,
+            os.path.join(staging, "marks"),
+            format="parquet",
+            partitioning=["class_name", "subject_name"],
+            partitioning_flavor="hive",
+            existing_data_behavior="error",
+        )
+        pa.parquet.write_table(pa.Table.from_pylist(crud.get_leaderboard(db)), os.path.join(staging, "leaderboard.parquet"))
+        pa.parquet.write_table(pa.Table.from_pylist(crud.get_subject_averages(db)), os.path.join(staging, "subject_averages.parquet"))
+        if os.path.exists(base_dir):
+            previous = staging + ".old"
+            os.rename(base_dir, previous)
+            os.rename(staging, base_dir)
+            shutil.rmtree(previous)
+        else:
+            os.rename(staging, base_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return base_dir
+
+
+# --- CLI ---
+# python -m backend.export marks --format parquet --output marks.parquet [--class-name 10A] [--subject-id 3]
+# python -m backend.export snapshot --output snapshots/2026-06-30
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.export", description="Columnar export of marks")
+    parser.add_argument("--school", default=None, help="school code (defaults to DEFAULT_SCHOOL)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    marks = commands.add_parser("marks", help="write marks as one Arrow IPC stream or Parquet file")
+    marks.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet")
+    marks.add_argument("--output", required=True)
+    marks.add_argument("--class-name")
+    marks.add_argument("--subject-id", type=int)
+
+    snapshot = commands.add_parser("snapshot", help="write a partitioned Parquet snapshot directory")
+    snapshot.add_argument("--output", required=True)
+
+    args = parser.parse_args(argv)
+    with read_session_for(args.school) as db:
+        if args.command == "marks":
+            rows = write_marks(db, args.output, args.format, args.class_name, args.subject_id)
+            print(f"Wrote {rows} marks to {args.output}")
+        else:
+            write_snapshot(db, args.output)
+            print(f"Wrote snapshot to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from functools import lru_cache
+from typing import List, Optional
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter, create_model
+
+# Sparse fieldsets for list endpoints: ?fields=id,roll_number,user.name
+# Fields are leaf paths into the endpoint's normal response schema. The crud layer
+# selects only the matching columns (and joins), and the response is validated
+# against a trimmed copy of the schema holding just those fields.
+
+def parse_fields(fields: Optional[str], allowed):
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+    return names
+
+@lru_cache(maxsize=256)
+def trimmed_model(model, names: tuple):
+    groups = {}
+    for name in names:
+        head, _, rest = name.partition(".")
+        groups.setdefault(head, []).append(rest)
+    definitions = {}
+    for head, rests in groups.items():
+        annotation = model.model_fields[head].annotation
+        if all(rests):
+            annotation = trimmed_model(annotation, tuple(rests))
+        definitions[head] = (annotation, ...)
+    return create_model(f"{model.__name__}Fields", **definitions)
+
+@lru_cache(maxsize=256)
+def _list_adapter(model, names: tuple):
+    return TypeAdapter(List[trimmed_model(model, names)])
+
+def nest(names, row):
+    item = {}
+    for name, value in zip(names, row):
+        *parents, leaf = name.split(".")
+        target = item
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    return item
+
+def respond(model, names, rows):
+    adapter = _list_adapter(model, names)
+    items = adapter.validate_python([nest(names, row) for row in rows])
+    return JSONResponse(content=adapter.dump_python(items, mode="json"))
@@ -0,0 +1,301 @@
+import os
+import csv
+import io
+import json
+import socket
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from backend.database import engines, session_for, school_of
+from backend.models import Job, Mark, Student, Subject, Teacher, User
+from backend import crud, reports
+
+# In-process background jobs. Job records live in the database so clients can poll
+# them; the work itself runs on a small bounded thread pool next to the API workers.
+# Several API processes may share a database: each job records the process that owns
+# it, which refreshes the job's heartbeat while it is queued or running. Only jobs
+# whose heartbeat has gone stale (their process died) are failed by recovery.
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "20"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+QUEUED, RUNNING, CANCELLING = "queued", "running", "cancelling"
+SUCCEEDED, FAILED, CANCELLED = "succeeded", "failed", "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+ACTIVE_STATES = (QUEUED, RUNNING, CANCELLING)
+
+# A handler may return a JobFile instead of JSON-serializable data to control the download
+JobFile = namedtuple("JobFile", ["content", "media_type", "filename"])
+
+class JobQueueFull(Exception):
+    pass
+
+class JobCancelled(Exception):
+    pass
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_slots = threading.BoundedSemaphore(JOB_MAX_PENDING)
+_futures = {}
+_cancel_requested = set()
+_lock = threading.Lock()
+_heartbeat = None
+_heartbeat_stop = threading.Event()
+
+# kind -> (handler, roles allowed to submit it)
+JOB_HANDLERS = {}
+
+def job_handler(kind: str, roles):
+    def decorator(fn):
+        JOB_HANDLERS[kind] = (fn, tuple(roles))
+        return fn
+    return decorator
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class JobContext:
+    def __init__(self, db: Session, job: Job):
+        self.db = db
+        self.job = job
+        self.school = school_of(db)
+
+    @property
+    def owner_id(self):
+        return self.job.owner_id
+
+    def check_cancelled(self):
+        if (self.school, self.job.id) in _cancel_requested:
+            raise JobCancelled()
+
+    def progress(self, percent: int):
+        # Written through a separate session so the handler's open transaction and
+        # streaming cursors are left alone; also picks up cancels from other processes.
+        self.check_cancelled()
+        with session_for(self.school) as progress_db:
+            job = progress_db.query(Job).filter(Job.id == self.job.id).first()
+            if job.status == CANCELLING:
+                raise JobCancelled()
+            job.progress = max(0, min(100, int(percent)))
+            progress_db.commit()
+
+
+# --- Submission & Control ---
+
+def submit(db: Session, kind: str, user: User, params: dict = None):
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type '{kind}'")
+    if user.role not in JOB_HANDLERS[kind][1]:
+        raise PermissionError(f"Job type '{kind}' is not available to role '{user.role}'")
+    if not _slots.acquire(blocking=False):
+        raise JobQueueFull("Too many background jobs pending, try again later")
+
+    try:
+        _ensure_heartbeat()
+        job = Job(kind=kind, status=QUEUED, progress=0, owner_id=user.id, params=json.dumps(params or {}),
+                  worker=WORKER_ID, heartbeat_at=_now())
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        key = (school_of(db), job.id)
+        with _lock:
+            _futures[key] = _executor.submit(_run, *key)
+    except Exception:
+        _slots.release()
+        raise
+    return job
+
+def cancel(db: Session, job: Job):
+    if job.status in FINISHED_STATES:
+        return job
+    # Job ids are only unique within a school's database
+    key = (school_of(db), job.id)
+    # Conditional on the job still being active: the status checked above may be stale,
+    # and a job the worker has finished meanwhile must keep its result
+    still_active = db.query(Job).filter(Job.id == job.id, Job.status.in_(ACTIVE_STATES))
+    with _lock:
+        future = _futures.get(key)
+        if future is not None and future.cancel():
+            # Never started: the worker will not run, so finish the record here
+            _futures.pop(key, None)
+            _slots.release()
+            still_active.update({Job.status: CANCELLED, Job.finished_at: _now()}, synchronize_session=False)
+            db.commit()
+        else:
+            # Running (or queued in another process): the handler stops at its next checkpoint
+            requested = still_active.update({Job.status: CANCELLING}, synchronize_session=False)
+            db.commit()
+            if requested and future is not None:
+                _cancel_requested.add(key)
+    db.refresh(job)
+    return job
+
+def get_job(db: Session, job_id: int):
+    return db.query(Job).filter(Job.id == job_id).first()
+
+def get_jobs_for_user(db: Session, user_id: int, limit: int = 50):
+    return db.query(Job).filter(Job.owner_id == user_id).order_by(Job.id.desc()).limit(limit).all()
+
+def recover_interrupted(db: Session):
+    # Jobs whose process stopped refreshing their heartbeat can never complete. Jobs
+    # from before heartbeats existed have none and are recovered as well.
+    stale_before = _now() - timedelta(seconds=JOB_STALE_SECONDS)
+    recovered = db.query(Job).filter(
+        Job.status.in_(ACTIVE_STATES),
+        (Job.heartbeat_at == None) | (Job.heartbeat_at < stale_before),
+    ).update(
+        {Job.status: FAILED, Job.error: "Interrupted by server restart", Job.finished_at: _now()},
+        synchronize_session=False,
+    )
+    db.commit()
+    return recovered
+
+def shutdown():
+    _heartbeat_stop.set()
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Heartbeat ---
+
+def _ensure_heartbeat():
+    global _heartbeat
+    with _lock:
+        if _heartbeat is None or not _heartbeat.is_alive():
+            _heartbeat = threading.Thread(target=_heartbeat_loop, name="job-heartbeat", daemon=True)
+            _heartbeat.start()
+
+def _heartbeat_loop():
+    while not _heartbeat_stop.wait(JOB_HEARTBEAT_SECONDS):
+        with _lock:
+            owned = list(_futures)
+        by_school = {}
+        for school, job_id in owned:
+            by_school.setdefault(school, []).append(job_id)
+        for school in engines:
+            try:
+                with session_for(school) as db:
+                    if by_school.get(school):
+                        db.query(Job).filter(Job.id.in_(by_school[school]), Job.worker == WORKER_ID).update(
+                            {Job.heartbeat_at: _now()}, synchronize_session=False,
+                        )
+                        db.commit()
+                    # Also picks up jobs of processes that died after this one started
+                    recover_interrupted(db)
+            except Exception:
+                pass # retried on the next beat
+
+
+# --- Worker ---
+
+def _run(school: str, job_id: int):
+    db = session_for(school)
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job is None:
+            return
+        # Conditional, so a cancel (or recovery) committed after the load is not overwritten
+        started = db.query(Job).filter(Job.id == job_id, Job.status == QUEUED).update(
+            {Job.status: RUNNING, Job.started_at: _now()}, synchronize_session=False,
+        )
+        db.commit()
+        db.refresh(job)
+        if not started:
+            if job.status == CANCELLING:
+                job.status = CANCELLED
+                job.finished_at = _now()
+                db.commit()
+            return
+        handler = JOB_HANDLERS[job.kind][0]
+
+        ctx = JobContext(db, job)
+        kind, params = job.kind, json.loads(job.params or "{}")
+        try:
+            ctx.check_cancelled()
+            output = handler(db, ctx, **params)
+        except JobCancelled:
+            db.rollback()
+            outcome = {Job.status: CANCELLED}
+        except Exception as e:
+            db.rollback()
+            outcome = {Job.status: FAILED, Job.error: str(e)}
+        else:
+            if not isinstance(output, JobFile):
+                output = JobFile(json.dumps(output, default=str), "application/json", f"{kind}-{job_id}.json")
+            content = output.content
+            outcome = {
+                Job.result: content.encode("utf-8") if isinstance(content, str) else content,
+                Job.result_media_type: output.media_type,
+                Job.result_filename: output.filename,
+                Job.status: SUCCEEDED,
+                Job.progress: 100,
+            }
+        outcome[Job.finished_at] = _now()
+        # Only a job that is still ours to finish: never resurrect one already failed by recovery
+        db.query(Job).filter(Job.id == job_id, Job.status.in_([RUNNING, CANCELLING])).update(outcome, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+        with _lock:
+            _futures.pop((school, job_id), None)
+            _cancel_requested.discard((school, job_id))
+        _slots.release()
+
+
+# --- Job Handlers ---
+# Parameters are passed as keyword arguments from the JSON body of the submission.
+
+@job_handler("leaderboard", roles=["admin"])
+def _leaderboard_job(db: Session, ctx: JobContext):
+    return crud.get_leaderboard(db)
+
+@job_handler("subject_averages", roles=["admin", "teacher"])
+def _subject_averages_job(db: Session, ctx: JobContext):
+    owner = db.query(User).filter(User.id == ctx.owner_id).first()
+    if owner.role == "teacher":
+        return crud.teacher_get_subject_averages(db, owner.id)
+    return crud.get_subject_averages(db)
+
+@job_handler("marks_export", roles=["admin", "teacher"])
+def _marks_export_job(db: Session, ctx: JobContext, batch_size: int = 1000):
+    owner = db.query(User).filter(User.id == ctx.owner_id).first()
+    query = db.query(
+        Student.roll_number, User.name, Student.class_name, Subject.name, Mark.marks, Mark.created_at
+    ).join(Student, Student.id == Mark.student_id)\
+     .join(User, User.id == Student.user_id)\
+     .join(Subject, Subject.id == Mark.subject_id)
+    if owner.role == "teacher":
+        query = query.join(Teacher, Teacher.id == Subject.teacher_id).filter(Teacher.user_id == owner.id)
+
+    total = query.count() or 1
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["roll_number", "student_name", "class_name", "subject", "marks", "created_at"])
+    for i, row in enumerate(query.order_by(Mark.id).yield_per(batch_size), start=1):
+        writer.writerow(row)
+        if i % batch_size == 0:
+            ctx.progress(i * 100 // total)
+    return JobFile(out.getvalue(), "text/csv", f"marks-export-{ctx.job.id}.csv")
+
+@job_handler("report_cards", roles=["admin"])
+def _report_cards_job(db: Session, ctx: JobContext, class_name: str, formats=("html", "pdf")):
+    formats = [f for f in formats if f in ("html", "pdf")]
+    if not formats:
+        raise ValueError("formats must include 'html' and/or 'pdf'")
+    cards = crud.get_class_report_data(db, class_name)
+    if not cards:
+        raise ValueError(f"No students found in class '{class_name}'")
+    ctx.progress(5)
+
+    def on_progress(done, total):
+        ctx.progress(5 + done * 90 // total)
+
+    archive, summary = reports.build_report_archive(cards, formats=formats, on_progress=on_progress)
+    safe_name = "".join(ch if ch.isalnum() else "_" for ch in class_name)
+    return JobFile(archive, "application/zip", f"report-cards-{safe_name}-{ctx.job.id}.zip")
@@ -0,0 +1,142 @@
+import os
+import json
+import asyncio
+import threading
+from starlette.concurrency import run_in_threadpool
+from backend.database import session_for
+from backend import crud, query_budget
+
+# Live analytics over Server-Sent Events. Every (school, scope) pair has one hub
+# holding the latest snapshot and the connected dashboards. Mark writes mark the
+# hub dirty; after a short debounce it recomputes once, diffs the result against
+# the previous snapshot and pushes only the changed rows to every subscriber.
+# Hubs live in the process, so this is meant for a single API worker process.
+
+LIVE_DEBOUNCE_SECONDS = float(os.getenv("LIVE_DEBOUNCE_SECONDS", "0.5"))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+LIVE_QUEUE_SIZE = 100
+
+# Sections of a snapshot and the key identifying a row in each
+SECTION_KEYS = {"leaderboard": "student_id", "subjects": "subject_name"}
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+
+def _compute(school: str, scope: str):
+    # Runs in a worker thread; always reads the primary so deltas include the write
+    # that triggered them
+    with session_for(school, query_budget.scope_for("analytics")) as db:
+        if scope == "admin":
+            return {"leaderboard": crud.get_leaderboard(db), "subjects": crud.get_subject_averages(db)}
+        teacher_user_id = int(scope.split(":", 1)[1])
+        return {"subjects": crud.teacher_get_subject_averages(db, teacher_user_id)}
+
+def diff_snapshots(old: dict, new: dict):
+    delta = {}
+    for section, rows in new.items():
+        key = SECTION_KEYS[section]
+        before = {row[key]: row for row in old.get(section, [])}
+        after = {row[key]: row for row in rows}
+        upsert = [row for k, row in after.items() if before.get(k) != row]
+        remove = [k for k in before if k not in after]
+        if upsert or remove:
+            delta[section] = {"upsert": upsert, "remove": remove}
+    return delta
+
+
+class LiveHub:
+    def __init__(self, school: str, scope: str, loop):
+        self.school = school
+        self.scope = scope
+        self.loop = loop
+        self.snapshot = None
+        self.subscribers = set()
+        self.joining = 0 # handed out by _get_hub, not yet subscribed; guarded by _hubs_lock
+        self.refresh_pending = False
+        self.lock = asyncio.Lock()
+
+    async def subscribe(self):
+        queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+        try:
+            async with self.lock:
+                if self.snapshot is None:
+                    self.snapshot = await run_in_threadpool(_compute, self.school, self.scope)
+                queue.put_nowait(("snapshot", self.snapshot))
+                self.subscribers.add(queue)
+        finally:
+            with _hubs_lock:
+                self.joining -= 1
+                self._discard_if_idle()
+        return queue
+
+    def unsubscribe(self, queue):
+        with _hubs_lock:
+            self.subscribers.discard(queue)
+            self._discard_if_idle()
+
+    def _discard_if_idle(self):
+        # Caller holds _hubs_lock. A hub someone is still joining stays registered,
+        # otherwise they would end up on a hub notify() no longer reaches.
+        if not self.subscribers and not self.joining and _hubs.get((self.school, self.scope)) is self:
+            del _hubs[(self.school, self.scope)]
+
+    def mark_dirty(self):
+        # Event-loop thread only; coalesces bursts of writes into one recompute
+        if not self.refresh_pending:
+            self.refresh_pending = True
+            self.loop.create_task(self._refresh())
+
+    async def _refresh(self):
+        await asyncio.sleep(LIVE_DEBOUNCE_SECONDS)
+        self.refresh_pending = False
+        async with self.lock:
+            new = await run_in_threadpool(_compute, self.school, self.scope)
+            delta = diff_snapshots(self.snapshot or {}, new)
+            self.snapshot = new
+        if delta:
+            self._broadcast(("delta", delta))
+
+    def _broadcast(self, event):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up: drop it, EventSource reconnects and gets a fresh snapshot
+                self.subscribers.discard(queue)
+
+
+def _get_hub(school: str, scope: str):
+    loop = asyncio.get_running_loop()
+    with _hubs_lock:
+        hub = _hubs.get((school, scope))
+        if hub is None:
+            hub = _hubs[(school, scope)] = LiveHub(school, scope, loop)
+        hub.joining += 1
+        return hub
+
+def notify(school: str, teacher_user_id: int):
+    # Called from sync request handlers (thread pool) after a mark write
+    with _hubs_lock:
+        hubs = [hub for (s, scope), hub in _hubs.items() if s == school and scope in ("admin", f"teacher:{teacher_user_id}")]
+    for hub in hubs:
+        hub.loop.call_soon_threadsafe(hub.mark_dirty)
+
+def _format_event(name: str, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+async def event_stream(request, school: str, scope: str):
+    hub = _get_hub(school, scope)
+    queue = await hub.subscribe()
+    try:
+        while not await request.is_disconnected():
+            try:
+                name, data = await asyncio.wait_for(queue.get(), timeout=LIVE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if queue not in hub.subscribers:
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield _format_event(name, data)
+    finally:
+        hub.unsubscribe(queue)
@@ -1,30 +1,110 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from backend.routers import auth_router, admin_router, teacher_router, student_router, analytics_router
-from backend.database import engine
-from backend import models
+from backend.routers import auth_router, admin_router, teacher_router, student_router, analytics_router, jobs_router
+from backend.database import engines, session_for, note_write
+from backend.auth import resolve_school, token_payload
+from backend import models, crud, jobs, audit, query_budget
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# Indexes added to tables that older databases already have. create_all skips
+# existing tables, so these are created with IF NOT EXISTS on every startup
+# (reflection cannot see expression indexes on SQLite, so checkfirst is not enough).
+UPGRADE_INDEXES = ("ix_subjects_teacher_id", "ix_users_name_prefix", "ix_users_email_prefix", "ix_students_roll_number_prefix")
+POSTGRES_UPGRADE_INDEXES = ("ix_users_name_trgm", "ix_users_email_trgm", "ix_students_roll_number_trgm")
 
-app = FastAPI(title="Student Performance & Analytics System (RBAC)")
+# Nullable columns added to tables that older databases already have
+UPGRADE_COLUMNS = {"jobs": ("worker", "heartbeat_at")}
 
-# CORS settings for frontend communication
+def _upgrade_columns(school_engine):
+    with school_engine.begin() as conn:
+        for table_name, column_names in UPGRADE_COLUMNS.items():
+            present = {column["name"] for column in inspect(conn).get_columns(table_name)}
+            for name in column_names:
+                if name not in present:
+                    column_type = models.Base.metadata.tables[table_name].c[name].type.compile(conn.dialect)
+                    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type}"))
+
+def _upgrade_indexes(school_engine):
+    names = UPGRADE_INDEXES + (POSTGRES_UPGRADE_INDEXES if school_engine.dialect.name == "postgresql" else ())
+    with school_engine.begin() as conn:
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name in names:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+
+# Create database tables in every school's database
+for school_engine in engines.values():
+    if school_engine.dialect.name == "postgresql":
+        # Roster search trigram indexes need the extension before the tables are created
+        with school_engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    models.Base.metadata.create_all(bind=school_engine)
+    _upgrade_columns(school_engine)
+    _upgrade_indexes(school_engine)
+
+# Enroll students in the subjects they already have marks in when upgrading a
+# database from before enrollments
+for school in engines:
+    with session_for(school) as db:
+        crud.backfill_enrollments(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for school in engines:
+        with session_for(school) as db:
+            jobs.recover_interrupted(db)
+    yield
+    jobs.shutdown()
+    audit.shutdown()
+
+app = FastAPI(title="Student Performance & Analytics System (RBAC)", lifespan=lifespan)
+
+# CORS: browsers only call the API directly for analytics reads (with a bearer
+# browser token, no cookies); everything else goes through the Flask frontend
+CORS_ALLOW_ORIGINS = [o.strip() for o in os.getenv("CORS_ALLOW_ORIGINS", "http://localhost:5000,http://127.0.0.1:5000").split(",") if o.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ALLOW_ORIGINS,
+    allow_credentials=False,
+    allow_methods=["GET"],
+    allow_headers=["Authorization"],
+    max_age=600,
 )
 
+# Route every request to its school's database, and remember successful writes so
+# the same user's reads stay on the primary until replicas have caught up
+@app.middleware("http")
+async def route_school(request: Request, call_next):
+    payload = token_payload(request)
+    school = resolve_school(request, payload)
+    if school not in engines:
+        return JSONResponse(status_code=400, content={"detail": f"Unknown school '{school}'"})
+    request.state.school = school
+    request.state.subject = payload.get("sub") if payload else None
+
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400 and request.state.subject:
+        note_write(school, request.state.subject)
+    db_role = getattr(request.state, "db_role", None)
+    if db_role:
+        response.headers["X-Database-Role"] = db_role
+    return response
+
+# Outermost: per-route-class statement timeouts and cancellation on disconnect
+query_budget.install(app)
+
 # Include Routers
 app.include_router(auth_router.router)
 app.include_router(admin_router.router)
 app.include_router(teacher_router.router)
 app.include_router(student_router.router)
 app.include_router(analytics_router.router)
+app.include_router(jobs_router.router)
 
 @app.get("/")
 def read_root():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, UniqueConstraint, DateTime
+from sqlalchemy import Column, Integer, String, Text, LargeBinary, Numeric, ForeignKey, UniqueConstraint, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from backend.database import Base
@@ -12,9 +12,18 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     role = Column(String(50), nullable=False) # admin, teacher, student
 
+    # Roster search: lower() indexes serve prefix matches on every backend; the
+    # PostgreSQL-only trigram indexes serve substring and fuzzy matches
+    __table_args__ = (
+        Index('ix_users_name_prefix', func.lower(name).label('name_lower'), postgresql_ops={'name_lower': 'text_pattern_ops'}),
+        Index('ix_users_email_prefix', func.lower(email).label('email_lower'), postgresql_ops={'email_lower': 'text_pattern_ops'}),
+        Index('ix_users_name_trgm', name, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        Index('ix_users_email_trgm', email, postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
+
     # Relationships mapped to derived tables
-    student_profile = relationship("Student", back_populates="user", uselist=False, cascade="all, delete")
-    teacher_profile = relationship("Teacher", back_populates="user", uselist=False, cascade="all, delete")
+    student_profile = relationship("Student", back_populates="user", uselist=False, cascade="all, delete", passive_deletes=True)
+    teacher_profile = relationship("Teacher", back_populates="user", uselist=False, cascade="all, delete", passive_deletes=True)
 
 
 class Student(Base):
@@ -25,9 +34,15 @@ class Student(Base):
     class_name = Column(String(100), nullable=False, name="class_name")
     roll_number = Column(String(50), unique=True, nullable=False)
 
+    __table_args__ = (
+        Index('ix_students_roll_number_prefix', func.lower(roll_number).label('roll_number_lower'), postgresql_ops={'roll_number_lower': 'text_pattern_ops'}),
+        Index('ix_students_roll_number_trgm', roll_number, postgresql_using='gin', postgresql_ops={'roll_number': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
+
     # Relationships
     user = relationship("User", back_populates="student_profile")
-    marks = relationship("Mark", back_populates="student", cascade="all, delete")
+    marks = relationship("Mark", back_populates="student", cascade="all, delete", passive_deletes=True)
+    enrollments = relationship("Enrollment", back_populates="student", cascade="all, delete", passive_deletes=True)
 
 
 class Teacher(Base):
@@ -38,7 +53,7 @@ class Teacher(Base):
     
     # Relationships
     user = relationship("User", back_populates="teacher_profile")
-    subjects = relationship("Subject", back_populates="teacher", cascade="all, delete-orphan")
+    subjects = relationship("Subject", back_populates="teacher", passive_deletes=True)
 
 
 class Subject(Base):
@@ -46,11 +61,31 @@ class Subject(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), unique=True, index=True, nullable=False)
-    teacher_id = Column(Integer, ForeignKey("teachers.id", ondelete="SET NULL"), nullable=True)
+    teacher_id = Column(Integer, ForeignKey("teachers.id", ondelete="SET NULL"), nullable=True, index=True)
 
     # Relationships
     teacher = relationship("Teacher", back_populates="subjects")
-    marks = relationship("Mark", back_populates="subject", cascade="all, delete")
+    marks = relationship("Mark", back_populates="subject", cascade="all, delete", passive_deletes=True)
+    enrollments = relationship("Enrollment", back_populates="subject", cascade="all, delete", passive_deletes=True)
+
+
+class Enrollment(Base):
+    __tablename__ = "enrollments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
+    subject_id = Column(Integer, ForeignKey("subjects.id", ondelete="CASCADE"), nullable=False)
+
+    # The unique constraint covers lookups by student; the extra index serves
+    # the teacher roster query, which always starts from the subject side.
+    __table_args__ = (
+        UniqueConstraint('student_id', 'subject_id', name='uq_enrollment_student_subject'),
+        Index('ix_enrollments_subject_student', 'subject_id', 'student_id'),
+    )
+
+    # Relationships
+    student = relationship("Student", back_populates="enrollments")
+    subject = relationship("Subject", back_populates="enrollments")
 
 
 class Mark(Base):
@@ -68,3 +103,59 @@ class Mark(Base):
     # Relationships
     student = relationship("Student", back_populates="marks")
     subject = relationship("Subject", back_populates="marks")
+
+
+class ArchivedMark(Base):
+    __tablename__ = "archived_marks"
+
+    # Denormalized snapshot: survives deletion of the student, subject and user rows
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, nullable=False, index=True)
+    student_name = Column(String(255), nullable=False)
+    roll_number = Column(String(50), nullable=False)
+    class_name = Column(String(100), nullable=False, index=True)
+    subject_id = Column(Integer, nullable=False)
+    subject_name = Column(String(255), nullable=False)
+    marks = Column(Numeric(5, 2), nullable=False)
+    created_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, index=True) # queued, running, succeeded, failed, cancelled
+    progress = Column(Integer, nullable=False, default=0)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    params = Column(Text)
+    result = Column(LargeBinary)
+    result_media_type = Column(String(100))
+    result_filename = Column(String(255))
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    worker = Column(String(100)) # host:pid of the process running the job
+    heartbeat_at = Column(DateTime(timezone=True))
+
+
+class AuditEvent(Base):
+    __tablename__ = "audit_events"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    # No foreign key: the trail has to outlive deleted users and records
+    actor_id = Column(Integer)
+    actor_role = Column(String(50))
+    action = Column(String(50), nullable=False) # create, update, delete, archive, enroll, assign
+    entity_type = Column(String(50), nullable=False) # mark, student, teacher, subject, enrollment
+    entity_id = Column(Integer)
+    details = Column(Text) # JSON
+
+    __table_args__ = (
+        Index('ix_audit_events_actor_time', 'actor_id', 'created_at'),
+        Index('ix_audit_events_entity_time', 'entity_type', 'entity_id', 'created_at'),
+        Index('ix_audit_events_created_at', 'created_at'),
+    )
@@ -0,0 +1,140 @@
+import os
+import asyncio
+import threading
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from backend.database import QueryScope, QueryCancelled
+
+# Per-route-class time budgets. Every request gets a QueryScope whose budget is
+# applied to its database sessions as a statement timeout; when the client
+# disconnects mid-request the scope cancels whatever query is still running.
+# Timeouts answer 504, an exhausted pool or unavailable database 503, and both are
+# counted per route class.
+
+STATEMENT_TIMEOUTS_MS = {
+    "auth": int(os.getenv("STATEMENT_TIMEOUT_AUTH_MS", "2000")),
+    "crud": int(os.getenv("STATEMENT_TIMEOUT_CRUD_MS", "5000")),
+    "analytics": int(os.getenv("STATEMENT_TIMEOUT_ANALYTICS_MS", "15000")),
+    "export": int(os.getenv("STATEMENT_TIMEOUT_EXPORT_MS", "300000")),
+}
+
+# First matching path prefix wins; anything else under /api is "crud"
+ROUTE_CLASSES = (
+    ("/api/auth", "auth"),
+    ("/api/analytics", "analytics"),
+    ("/api/admin/export", "export"),
+)
+
+RETRY_AFTER_SECONDS = 5
+
+_stats = {name: {"requests": 0, "timeouts": 0, "cancelled": 0, "pool_exhausted": 0, "unavailable": 0} for name in STATEMENT_TIMEOUTS_MS}
+_stats_lock = threading.Lock()
+
+
+def route_class(path: str):
+    for prefix, name in ROUTE_CLASSES:
+        if path.startswith(prefix):
+            return name
+    return "crud"
+
+def scope_for(name: str):
+    return QueryScope(STATEMENT_TIMEOUTS_MS[name] or None, name)
+
+def _count(name: str, counter: str):
+    with _stats_lock:
+        _stats[name][counter] += 1
+
+def stats():
+    with _stats_lock:
+        return {name: dict(counters, budget_ms=STATEMENT_TIMEOUTS_MS[name]) for name, counters in _stats.items()}
+
+
+# --- Middleware ---
+
+class QueryBudgetMiddleware:
+    # Pure ASGI so it can watch the connection for http.disconnect while a sync
+    # handler is busy in the threadpool, which BaseHTTPMiddleware cannot do
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api"):
+            await self.app(scope, receive, send)
+            return
+
+        query_scope = scope_for(route_class(scope["path"]))
+        scope.setdefault("state", {})["query_scope"] = query_scope
+        _count(query_scope.label, "requests")
+
+        messages = asyncio.Queue()
+        response_done = False
+
+        async def pump():
+            # Sole reader of the real receive; the app reads from the queue instead
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    if not response_done and query_scope.cancel():
+                        _count(query_scope.label, "cancelled")
+                    return
+
+        async def app_receive():
+            message = await messages.get()
+            if message["type"] == "http.disconnect":
+                messages.put_nowait(message) # every later receive sees it too
+            return message
+
+        async def app_send(message):
+            nonlocal response_done
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_done = True
+            await send(message)
+
+        watcher = asyncio.create_task(pump())
+        try:
+            await self.app(scope, app_receive, app_send)
+        finally:
+            watcher.cancel()
+
+
+# --- Error Mapping ---
+
+def _label(request: Request):
+    query_scope = getattr(request.state, "query_scope", None)
+    return query_scope.label if query_scope else "crud"
+
+def _cancelled(request: Request):
+    query_scope = getattr(request.state, "query_scope", None)
+    return query_scope is not None and query_scope.cancelled
+
+def _is_statement_timeout(exc: OperationalError):
+    # 57014 is PostgreSQL's query_canceled; SQLite reports an interrupted statement
+    return getattr(exc.orig, "pgcode", None) == "57014" or str(exc.orig) == "interrupted"
+
+async def operational_error_handler(request: Request, exc: OperationalError):
+    label = _label(request)
+    if _cancelled(request):
+        return await query_cancelled_handler(request, exc)
+    if _is_statement_timeout(exc):
+        _count(label, "timeouts")
+        return JSONResponse(status_code=504, content={"detail": f"The query exceeded the {label} time budget"})
+    _count(label, "unavailable")
+    return JSONResponse(status_code=503, content={"detail": "Database unavailable, try again shortly"},
+                        headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    _count(_label(request), "pool_exhausted")
+    return JSONResponse(status_code=503, content={"detail": "Server busy, try again shortly"},
+                        headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+async def query_cancelled_handler(request: Request, exc: Exception):
+    # The client has already gone; this response is never read
+    return JSONResponse(status_code=503, content={"detail": "Request cancelled"})
+
+def install(app):
+    app.add_middleware(QueryBudgetMiddleware)
+    app.add_exception_handler(OperationalError, operational_error_handler)
+    app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+    app.add_exception_handler(QueryCancelled, query_cancelled_handler)
@@ -0,0 +1,143 @@
+import io
+import os
+import json
+import time
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+
+# Report card rendering. Only the standard library is imported here because the
+# renderers run inside worker processes that re-import this module.
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "0")) or os.cpu_count() or 1
+
+PDF_LINES_PER_PAGE = 50
+
+
+# --- Renderers ---
+
+def _card_lines(card: dict):
+    lines = [
+        "Report Card",
+        "",
+        f"Student: {card['student_name']}",
+        f"Roll Number: {card['roll_number']}",
+        f"Class: {card['class_name']}",
+        "",
+        f"{'Subject':<30}{'Marks':>10}{'Class Avg':>12}",
+    ]
+    for s in card["subjects"]:
+        class_avg = "-" if s["class_average"] is None else f"{s['class_average']:.2f}"
+        lines.append(f"{s['subject_name'][:30]:<30}{s['marks']:>10.2f}{class_avg:>12}")
+    lines.append("")
+    if card["average_marks"] is None:
+        lines.append("Overall Average: no marks recorded")
+    else:
+        lines.append(f"Overall Average: {card['average_marks']:.2f}%")
+        lines.append(f"Class Rank: {card['rank']} of {card['class_size']}")
+    return lines
+
+def render_html(card: dict):
+    rows = "".join(
+        f"<tr><td>{escape(s['subject_name'])}</td><td>{s['marks']:.2f}</td>"
+        f"<td>{'-' if s['class_average'] is None else format(s['class_average'], '.2f')}</td></tr>"
+        for s in card["subjects"]
+    )
+    if card["average_marks"] is None:
+        summary = "<p>No marks recorded.</p>"
+    else:
+        summary = (f"<p>Overall Average: <strong>{card['average_marks']:.2f}%</strong></p>"
+                   f"<p>Class Rank: <strong>{card['rank']}</strong> of {card['class_size']}</p>")
+    return (
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"UTF-8\">"
+        f"<title>Report Card - {escape(card['student_name'])}</title></head><body>"
+        f"<h1>Report Card</h1><p>Student: {escape(card['student_name'])}<br>"
+        f"Roll Number: {escape(card['roll_number'])}<br>Class: {escape(card['class_name'])}</p>"
+        "<table border=\"1\" cellpadding=\"4\"><thead><tr><th>Subject</th><th>Marks</th>"
+        f"<th>Class Average</th></tr></thead><tbody>{rows}</tbody></table>{summary}</body></html>"
+    )
+
+def _pdf_text(line: str):
+    text = line.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def render_pdf(card: dict):
+    # Minimal text-only PDF (Courier, A4) so no PDF library is needed
+    lines = _card_lines(card)
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)] or [[]]
+
+    objects = []
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>")
+    for pid, page_lines in zip(page_ids, pages):
+        body = "BT /F1 11 Tf 14 TL 50 790 Td " + " ".join(f"({_pdf_text(l)}) '" for l in page_lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {pid + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n".encode() + obj + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+def render_card(card: dict, formats=("html", "pdf")):
+    base = f"{card['roll_number']}_{card['student_id']}"
+    files = []
+    if "html" in formats:
+        files.append((f"html/{base}.html", render_html(card).encode("utf-8")))
+    if "pdf" in formats:
+        files.append((f"pdf/{base}.pdf", render_pdf(card)))
+    return files
+
+def _render_batch(args):
+    cards, formats = args
+    return [render_card(card, formats) for card in cards]
+
+
+# --- Batch Generation ---
+
+def build_report_archive(cards, formats=("html", "pdf"), workers: int = None, on_progress=None):
+    # Cards are rendered in batches across a process pool and written into one zip.
+    # Returns (archive bytes, summary dict with the measured cards/second).
+    workers = max(1, min(workers or REPORT_WORKERS, len(cards) or 1))
+    batch_size = max(1, len(cards) // (workers * 4))
+    batches = [(cards[i:i + batch_size], tuple(formats)) for i in range(0, len(cards), batch_size)]
+
+    started = time.perf_counter()
+    buffer = io.BytesIO()
+    done = 0
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        # spawn keeps the workers free of the API's threads, sockets and DB connections
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for rendered in pool.map(_render_batch, batches):
+                for files in rendered:
+                    for name, content in files:
+                        archive.writestr(name, content)
+                done += len(rendered)
+                if on_progress:
+                    on_progress(done, len(cards))
+        elapsed = time.perf_counter() - started
+        summary = {
+            "report_cards": len(cards),
+            "formats": list(formats),
+            "workers": workers,
+            "seconds": round(elapsed, 3),
+            "cards_per_second": round(len(cards) / elapsed, 2) if elapsed > 0 else None,
+        }
+        archive.writestr("summary.json", json.dumps(summary, indent=2))
+    return buffer.getvalue(), summary
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Dict, Any, Optional
 
-from backend import crud, schemas, models
-from backend.database import get_db
+from datetime import datetime
+
+from backend import crud, schemas, models, fieldsets, export, audit, query_budget, singleflight
+from backend.database import get_db, get_read_db
 from backend.auth import get_current_admin
+from backend.routers.jobs_router import submit_job
 
 router = APIRouter(
     prefix="/api/admin",
@@ -13,68 +17,209 @@ router = APIRouter(
 )
 
 @router.post("/teachers/", response_model=schemas.Teacher)
-def create_teacher(teacher: schemas.TeacherCreate, db: Session = Depends(get_db)):
+def create_teacher(teacher: schemas.TeacherCreate, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
     db_user = crud.get_user_by_email(db, email=teacher.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.admin_create_teacher(db=db, teacher=teacher)
+    db_teacher = crud.admin_create_teacher(db=db, teacher=teacher)
+    audit.record(actor, "create", "teacher", db_teacher.id, {"email": teacher.email})
+    return db_teacher
 
 @router.post("/students/", response_model=schemas.Student)
-def create_student(student: schemas.StudentCreate, db: Session = Depends(get_db)):
+def create_student(student: schemas.StudentCreate, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
     db_user = crud.get_user_by_email(db, email=student.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.admin_create_student(db=db, student=student)
+    db_student = crud.admin_create_student(db=db, student=student)
+    audit.record(actor, "create", "student", db_student.id, {"email": student.email, "class_name": student.class_name, "roll_number": student.roll_number})
+    return db_student
 
 @router.get("/students/", response_model=List[schemas.Student])
-def read_students(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.admin_get_all_students(db, skip=skip, limit=limit)
+def read_students(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_read_db)):
+    names = fieldsets.parse_fields(fields, crud.STUDENT_FIELD_COLUMNS)
+    if names is None:
+        return crud.admin_get_all_students(db, skip=skip, limit=limit)
+    return fieldsets.respond(schemas.Student, names, crud.admin_get_student_fields(db, names, skip=skip, limit=limit))
 
 @router.get("/teachers/", response_model=List[schemas.Teacher])
-def read_teachers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_teachers(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     return crud.admin_get_all_teachers(db, skip=skip, limit=limit)
 
 @router.post("/subjects/", response_model=schemas.Subject)
-def create_subject(subject: schemas.SubjectCreate, db: Session = Depends(get_db)):
+def create_subject(subject: schemas.SubjectCreate, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
     db_subject = db.query(models.Subject).filter(models.Subject.name == subject.name).first()
     if db_subject:
         raise HTTPException(status_code=400, detail="Subject already exists")
-    return crud.admin_create_subject(db=db, subject=subject)
+    db_subject = crud.admin_create_subject(db=db, subject=subject)
+    audit.record(actor, "create", "subject", db_subject.id, {"name": subject.name})
+    return db_subject
 
 @router.get("/subjects/", response_model=List[schemas.Subject])
-def read_subjects(db: Session = Depends(get_db)):
+def read_subjects(db: Session = Depends(get_read_db)):
     return crud.admin_get_all_subjects(db)
 
 @router.put("/subjects/{subject_id}/assign", response_model=schemas.Subject)
-def assign_subject_teacher(subject_id: int, assign: schemas.SubjectAssign, db: Session = Depends(get_db)):
+def assign_subject_teacher(subject_id: int, assign: schemas.SubjectAssign, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
     teacher = db.query(models.Teacher).filter(models.Teacher.id == assign.teacher_id).first()
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
     subject = crud.admin_assign_subject_to_teacher(db, subject_id, assign.teacher_id)
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
+    audit.record(actor, "assign", "subject", subject_id, {"teacher_id": assign.teacher_id})
     return subject
 
+@router.post("/enrollments/", response_model=schemas.Enrollment)
+def enroll_student(enrollment: schemas.EnrollmentCreate, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    if not db.query(models.Student).filter(models.Student.id == enrollment.student_id).first():
+        raise HTTPException(status_code=404, detail="Student not found")
+    if not db.query(models.Subject).filter(models.Subject.id == enrollment.subject_id).first():
+        raise HTTPException(status_code=404, detail="Subject not found")
+    existing = db.query(models.Enrollment).filter(
+        models.Enrollment.student_id == enrollment.student_id,
+        models.Enrollment.subject_id == enrollment.subject_id
+    ).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Student already enrolled in this subject")
+    db_enrollment = crud.admin_enroll_student(db, enrollment)
+    audit.record(actor, "enroll", "enrollment", db_enrollment.id, enrollment.model_dump())
+    return db_enrollment
+
+@router.post("/enrollments/class")
+def enroll_class(enrollment: schemas.ClassEnrollmentCreate, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    subject = db.query(models.Subject).filter(models.Subject.id == enrollment.subject_id).first()
+    if not subject:
+        raise HTTPException(status_code=404, detail="Subject not found")
+    enrolled = crud.admin_enroll_class(db, enrollment.class_name, enrollment.subject_id)
+    audit.record(actor, "enroll", "enrollment", None, {**enrollment.model_dump(), "enrolled": enrolled})
+    return {"message": "Success", "enrolled": enrolled}
+
+@router.get("/subjects/{subject_id}/enrollments", response_model=List[schemas.Enrollment])
+def read_subject_enrollments(subject_id: int, db: Session = Depends(get_read_db)):
+    return crud.admin_get_subject_enrollments(db, subject_id)
+
+@router.delete("/enrollments/{enrollment_id}")
+def delete_enrollment(enrollment_id: int, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    if crud.admin_delete_enrollment(db, enrollment_id):
+        audit.record(actor, "delete", "enrollment", enrollment_id)
+    return {"message": "Success"}
+
 @router.delete("/students/{student_id}")
-def delete_student(student_id: int, db: Session = Depends(get_db)):
-    db_student = db.query(models.Student).filter(models.Student.id == student_id).first()
-    if db_student:
-        db.delete(db_student)
-        db.commit()
+def delete_student(student_id: int, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    _audit_deleted(actor, "delete", "student", crud.admin_bulk_delete_students(db, ids=[student_id]))
     return {"message": "Success"}
 
 @router.delete("/teachers/{teacher_id}")
-def delete_teacher(teacher_id: int, db: Session = Depends(get_db)):
-    db_teacher = db.query(models.Teacher).filter(models.Teacher.id == teacher_id).first()
-    if db_teacher:
-        db.delete(db_teacher)
-        db.commit()
+def delete_teacher(teacher_id: int, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    _audit_deleted(actor, "delete", "teacher", crud.admin_bulk_delete_teachers(db, [teacher_id]))
     return {"message": "Success"}
 
 @router.delete("/subjects/{subject_id}")
-def delete_subject(subject_id: int, db: Session = Depends(get_db)):
-    db_subject = db.query(models.Subject).filter(models.Subject.id == subject_id).first()
-    if db_subject:
-        db.delete(db_subject)
-        db.commit()
+def delete_subject(subject_id: int, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    _audit_deleted(actor, "delete", "subject", crud.admin_bulk_delete_subjects(db, [subject_id]))
     return {"message": "Success"}
+
+# --- Bulk Delete & Archival ---
+
+def _audit_deleted(actor, action, entity_type, result, class_name=None):
+    # One event per deleted id so the entity filter finds it; a class selection is one
+    # event. Ids that matched nothing are not recorded.
+    deleted_ids = result.pop("deleted_ids")
+    if not deleted_ids:
+        return
+    if class_name:
+        audit.record(actor, action, entity_type, None, {**result, "class_name": class_name})
+    else:
+        for entity_id in deleted_ids:
+            audit.record(actor, action, entity_type, entity_id, result)
+
+@router.post("/students/bulk-delete", response_model=schemas.BulkDeleteResult)
+def bulk_delete_students(selection: schemas.StudentSelection, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    try:
+        result = crud.admin_bulk_delete_students(db, ids=selection.ids, class_name=selection.class_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _audit_deleted(actor, "delete", "student", result, None if selection.ids else selection.class_name)
+    return result
+
+@router.post("/students/archive", response_model=schemas.BulkDeleteResult)
+def archive_students(selection: schemas.StudentSelection, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    try:
+        result = crud.admin_archive_students(db, ids=selection.ids, class_name=selection.class_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _audit_deleted(actor, "archive", "student", result, None if selection.ids else selection.class_name)
+    return result
+
+@router.post("/teachers/bulk-delete", response_model=schemas.BulkDeleteResult)
+def bulk_delete_teachers(selection: schemas.IdSelection, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    result = crud.admin_bulk_delete_teachers(db, selection.ids)
+    _audit_deleted(actor, "delete", "teacher", result)
+    return result
+
+@router.post("/subjects/bulk-delete", response_model=schemas.BulkDeleteResult)
+def bulk_delete_subjects(selection: schemas.IdSelection, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    result = crud.admin_bulk_delete_subjects(db, selection.ids)
+    _audit_deleted(actor, "delete", "subject", result)
+    return result
+
+@router.post("/subjects/archive", response_model=schemas.BulkDeleteResult)
+def archive_subjects(selection: schemas.IdSelection, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    result = crud.admin_archive_subjects(db, selection.ids)
+    _audit_deleted(actor, "archive", "subject", result)
+    return result
+
+# --- Audit Log ---
+# Events are written behind the request, so the newest ones appear within about
+# AUDIT_FLUSH_INTERVAL_SECONDS.
+
+@router.get("/audit", response_model=List[schemas.AuditEvent])
+def read_audit_events(
+    actor_id: Optional[int] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    return audit.query_events(db, actor_id=actor_id, entity_type=entity_type, entity_id=entity_id,
+                              since=since, until=until, before_id=before_id, limit=limit)
+
+@router.get("/audit/stats", response_model=schemas.AuditStats)
+def read_audit_stats():
+    return audit.stats()
+
+# --- Query Budgets ---
+
+@router.get("/query-stats", response_model=Dict[str, schemas.QueryClassStats])
+def read_query_stats():
+    return query_budget.stats()
+
+@router.get("/coalescing-stats", response_model=Dict[str, schemas.CoalescingStats])
+def read_coalescing_stats():
+    return singleflight.stats()
+
+# --- Columnar Export ---
+
+@router.get("/export/marks")
+def export_marks(request: Request, format: str = "arrow", class_name: Optional[str] = None, subject_id: Optional[int] = None):
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(export.EXPORT_FORMATS)}")
+    try:
+        export.mark_schema()
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    media_type, extension = export.EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export.stream_marks(request.state.school, format, class_name=class_name, subject_id=subject_id, query_scope=request.state.query_scope),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="marks.{extension}"'},
+    )
+
+# --- Background Jobs ---
+
+@router.post("/jobs/{kind}", response_model=schemas.Job, status_code=202)
+def submit_admin_job(kind: str, params: Optional[Dict[str, Any]] = Body(None), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_admin)):
+    return submit_job(db, kind, current_user, params)
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict
 
-from backend import crud, schemas, models
-from backend.database import get_db
-from backend.auth import get_current_user
+from backend import crud, schemas, models, live
+from backend.database import get_read_db, scatter
+from backend.auth import get_current_user, get_stream_user
 
 router = APIRouter(
     prefix="/api/analytics",
@@ -14,23 +15,57 @@ router = APIRouter(
 # Shared but isolated logic router
 
 @router.get("/admin/leaderboard", response_model=List[schemas.LeaderboardEntry])
-def get_admin_leaderboard(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def get_admin_leaderboard(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     if current_user.role != "admin": raise HTTPException(status_code=403, detail="Forbidden")
-    return crud.get_leaderboard(db)
+    return crud.shared_leaderboard(db)
 
 @router.get("/admin/subjects", response_model=List[schemas.SubjectAverage])
-def get_admin_subjects(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def get_admin_subjects(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     if current_user.role != "admin": raise HTTPException(status_code=403, detail="Forbidden")
     return crud.get_subject_averages(db)
 
+@router.get("/admin/schools", response_model=schemas.CrossSchoolAnalytics)
+def get_cross_school_analytics(current_user: models.User = Depends(get_current_user)):
+    if current_user.role != "admin": raise HTTPException(status_code=403, detail="Forbidden")
+    # Scatter to every school's database in parallel, then merge the totals
+    summaries = scatter(crud.get_school_summary, read_only=True)
+    subject_totals = {}
+    for summary in summaries.values():
+        for name, total, count in summary["subject_totals"]:
+            running = subject_totals.setdefault(name, [0.0, 0])
+            running[0] += total
+            running[1] += count
+    return {
+        "schools": [{"school": school, **summary} for school, summary in summaries.items()],
+        "subject_averages": [
+            {"subject_name": name, "average_marks": round(total / count, 2)}
+            for name, (total, count) in sorted(subject_totals.items())
+        ],
+    }
+
 @router.get("/teacher/subjects", response_model=List[schemas.SubjectAverage])
-def get_teacher_subjects(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def get_teacher_subjects(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     if current_user.role != "teacher": raise HTTPException(status_code=403, detail="Forbidden")
     return crud.teacher_get_subject_averages(db, current_user.id)
 
 @router.get("/student/stats", response_model=schemas.RankInfo)
-def get_student_stats(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def get_student_stats(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     if current_user.role != "student": raise HTTPException(status_code=403, detail="Forbidden")
     stats = crud.student_get_my_stats(db, current_user.id)
     if not stats: raise HTTPException(status_code=404, detail="Not found")
     return stats
+
+@router.get("/live")
+async def stream_live_analytics(request: Request, current_user: models.User = Depends(get_stream_user)):
+    # Server-Sent Events: one "snapshot" event, then "delta" events after mark writes
+    if current_user.role == "admin":
+        scope = "admin"
+    elif current_user.role == "teacher":
+        scope = f"teacher:{current_user.id}"
+    else:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return StreamingResponse(
+        live.event_stream(request, request.state.school, scope),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
 from backend import schemas, models
 from backend.database import get_db
-from backend.auth import verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from backend.auth import verify_password, user_by_email, create_access_token, create_browser_token, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES, BROWSER_TOKEN_EXPIRE_SECONDS
 
 router = APIRouter(
     prefix="/api/auth",
@@ -13,8 +13,8 @@ router = APIRouter(
 )
 
 @router.post("/login", response_model=schemas.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
+def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = user_by_email(db, form_data.username)
     if not user or not verify_password(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -24,8 +24,17 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    # Inject role into payload
+    # Inject role and school into payload
     access_token = create_access_token(
-        data={"sub": user.email, "role": user.role}, expires_delta=access_token_expires
+        data={"sub": user.email, "role": user.role, "school": request.state.school}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
+
+@router.post("/browser-token", response_model=schemas.BrowserToken)
+def issue_browser_token(request: Request, current_user: models.User = Depends(get_current_user)):
+    # Minted by the frontend server for the browser: read-only analytics access that expires quickly
+    return {
+        "access_token": create_browser_token(current_user, request.state.school),
+        "token_type": "bearer",
+        "expires_in": BROWSER_TOKEN_EXPIRE_SECONDS,
+    }
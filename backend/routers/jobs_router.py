@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional
+
+from backend import schemas, models, jobs
+from backend.database import get_db
+from backend.auth import get_current_user
+
+router = APIRouter(
+    prefix="/api/jobs",
+    tags=["jobs"]
+)
+
+def get_owned_job(job_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    job = jobs.get_job(db, job_id)
+    if not job or (job.owner_id != current_user.id and current_user.role != "admin"):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def submit_job(db: Session, kind: str, current_user: models.User, params: Optional[Dict[str, Any]] = None):
+    # Shared by the admin and teacher routers' job submission endpoints
+    try:
+        return jobs.submit(db, kind, current_user, params)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except jobs.JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+@router.get("/", response_model=List[schemas.Job])
+def read_my_jobs(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    return jobs.get_jobs_for_user(db, current_user.id)
+
+@router.get("/{job_id}", response_model=schemas.Job)
+def read_job(job: models.Job = Depends(get_owned_job)):
+    return job
+
+@router.post("/{job_id}/cancel", response_model=schemas.Job)
+def cancel_job(job: models.Job = Depends(get_owned_job), db: Session = Depends(get_db)):
+    return jobs.cancel(db, job)
+
+@router.get("/{job_id}/result")
+def download_job_result(job: models.Job = Depends(get_owned_job)):
+    if job.status != jobs.SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return Response(
+        content=job.result,
+        media_type=job.result_media_type,
+        headers={"Content-Disposition": f'attachment; filename="{job.result_filename}"'},
+    )
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from backend import crud, schemas, models
-from backend.database import get_db
+from backend import crud, schemas, models, fieldsets
+from backend.database import get_read_db
 from backend.auth import get_current_student
 
 router = APIRouter(
@@ -13,12 +13,15 @@ router = APIRouter(
 )
 
 @router.get("/profile", response_model=schemas.Student)
-def get_profile(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_student)):
+def get_profile(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_student)):
     profile = crud.student_get_my_profile(db, current_user.id)
     if not profile:
         raise HTTPException(status_code=404, detail="Student profile not found")
     return profile
 
 @router.get("/marks", response_model=List[schemas.MarkDetail])
-def get_my_marks(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_student)):
-    return crud.student_get_my_marks(db, current_user.id)
+def get_my_marks(fields: Optional[str] = None, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_student)):
+    names = fieldsets.parse_fields(fields, crud.MARK_FIELD_COLUMNS)
+    if names is None:
+        return crud.student_get_my_marks(db, current_user.id)
+    return fieldsets.respond(schemas.MarkDetail, names, crud.student_get_my_mark_fields(db, current_user.id, names))
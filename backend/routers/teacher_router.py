@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Dict, Any, Optional
 
-from backend import crud, schemas, models
-from backend.database import get_db
+from backend import crud, schemas, models, fieldsets, live, audit
+from backend.database import get_db, get_read_db
 from backend.auth import get_current_teacher
+from backend.routers.jobs_router import submit_job
 
 router = APIRouter(
     prefix="/api/teacher",
@@ -13,39 +14,62 @@ router = APIRouter(
 )
 
 @router.get("/subjects/", response_model=List[schemas.Subject])
-def get_my_subjects(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_teacher)):
+def get_my_subjects(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_teacher)):
     return crud.teacher_get_my_subjects(db, current_user.id)
 
 @router.get("/students/", response_model=List[schemas.Student])
-def get_my_students(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_teacher)):
-    return crud.teacher_get_my_students(db, current_user.id)
+def get_my_students(fields: Optional[str] = None, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_teacher)):
+    names = fieldsets.parse_fields(fields, crud.STUDENT_FIELD_COLUMNS)
+    if names is None:
+        return crud.teacher_get_my_students(db, current_user.id)
+    return fieldsets.respond(schemas.Student, names, crud.teacher_get_my_student_fields(db, current_user.id, names))
+
+@router.get("/students/search", response_model=List[schemas.Student])
+def search_my_students(
+    q: str = Query(..., min_length=1, max_length=100),
+    subject_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_teacher),
+):
+    return crud.teacher_search_students(db, current_user.id, q, subject_id=subject_id, limit=limit)
 
 @router.post("/marks/", response_model=schemas.Mark)
-def add_mark(mark: schemas.MarkCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_teacher)):
+def add_mark(mark: schemas.MarkCreate, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    # The actor is captured before the write's commit expires current_user
     try:
-        return crud.teacher_create_mark(db, mark, current_user.id)
+        result = crud.teacher_create_mark(db, mark, actor.user_id)
     except ValueError as e:
         raise HTTPException(status_code=403, detail=str(e))
+    audit.record(actor, "create", "mark", result.id, mark.model_dump())
+    live.notify(actor.school, actor.user_id)
+    return result
 
 @router.put("/marks/{mark_id}", response_model=schemas.Mark)
-def update_mark(mark_id: int, mark: schemas.MarkUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_teacher)):
+def update_mark(mark_id: int, mark: schemas.MarkUpdate, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
     try:
-        result = crud.teacher_update_mark(db, mark_id, mark, current_user.id)
+        result = crud.teacher_update_mark(db, mark_id, mark, actor.user_id)
         if not result:
             raise HTTPException(status_code=404, detail="Mark not found")
-        return result
     except ValueError as e:
         raise HTTPException(status_code=403, detail=str(e))
+    audit.record(actor, "update", "mark", mark_id, mark.model_dump())
+    live.notify(actor.school, actor.user_id)
+    return result
 
 @router.delete("/marks/{mark_id}")
-def delete_mark(mark_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_teacher)):
-    teacher = db.query(models.Teacher).filter(models.Teacher.user_id == current_user.id).first()
-    db_mark = db.query(models.Mark).filter(models.Mark.id == mark_id).first()
-    
-    if db_mark:
-        subject = db.query(models.Subject).filter(models.Subject.id == db_mark.subject_id, models.Subject.teacher_id == teacher.id).first()
-        if not subject:
-            raise HTTPException(status_code=403, detail="Not authorized to delete this record")
-        db.delete(db_mark)
-        db.commit()
+def delete_mark(mark_id: int, db: Session = Depends(get_db), actor: audit.Actor = Depends(audit.get_actor)):
+    try:
+        if not crud.teacher_delete_mark(db, mark_id, actor.user_id):
+            raise HTTPException(status_code=404, detail="Mark not found")
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    audit.record(actor, "delete", "mark", mark_id)
+    live.notify(actor.school, actor.user_id)
     return {"message": "Success"}
+
+# --- Background Jobs ---
+
+@router.post("/jobs/{kind}", response_model=schemas.Job, status_code=202)
+def submit_teacher_job(kind: str, params: Optional[Dict[str, Any]] = Body(None), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_teacher)):
+    return submit_job(db, kind, current_user, params)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, Json
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 # --- Token ---
@@ -7,6 +7,9 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+class BrowserToken(Token):
+    expires_in: int
+
 class TokenData(BaseModel):
     email: Optional[str] = None
     role: Optional[str] = None
@@ -74,6 +77,36 @@ class Subject(SubjectBase):
 class SubjectWithTeacher(Subject):
     teacher: Optional[Teacher]
 
+# --- Enrollment ---
+class EnrollmentCreate(BaseModel):
+    student_id: int
+    subject_id: int
+
+class ClassEnrollmentCreate(BaseModel):
+    class_name: str
+    subject_id: int
+
+class Enrollment(EnrollmentCreate):
+    id: int
+    class Config:
+        from_attributes = True
+
+# --- Bulk Operations ---
+class StudentSelection(BaseModel):
+    ids: Optional[List[int]] = None
+    class_name: Optional[str] = None
+
+class IdSelection(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+class BulkDeleteResult(BaseModel):
+    students: int = 0
+    teachers: int = 0
+    subjects: int = 0
+    marks: int = 0
+    enrollments: int = 0
+    archived_marks: int = 0
+
 # --- Mark ---
 class MarkBase(BaseModel):
     marks: float = Field(..., ge=0, le=100)
@@ -116,8 +149,71 @@ class AtRiskStudent(BaseModel):
     class_name: str
     failing_subjects: List[str]
 
+class SchoolSummary(BaseModel):
+    school: str
+    students: int
+    teachers: int
+    marks: int
+    average_marks: Optional[float]
+
+class CrossSchoolAnalytics(BaseModel):
+    schools: List[SchoolSummary]
+    subject_averages: List[SubjectAverage]
+
 class RankInfo(BaseModel):
     student_id: int
     average_marks: float
     rank: int
     percentile: float
+
+# --- Jobs ---
+class Job(BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: int
+    error: Optional[str] = None
+    result_filename: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
+
+# --- Audit ---
+class AuditEvent(BaseModel):
+    id: int
+    created_at: datetime
+    actor_id: Optional[int] = None
+    actor_role: Optional[str] = None
+    action: str
+    entity_type: str
+    entity_id: Optional[int] = None
+    details: Optional[Json[Dict[str, Any]]] = None
+    class Config:
+        from_attributes = True
+
+class AuditStats(BaseModel):
+    recorded: int
+    written: int
+    dropped: int
+    failed: int
+    buffered: int
+
+# --- Query Budgets ---
+class QueryClassStats(BaseModel):
+    budget_ms: int
+    requests: int
+    timeouts: int
+    cancelled: int
+    pool_exhausted: int
+    unavailable: int
+
+# --- Coalescing ---
+class CoalescingStats(BaseModel):
+    calls: int
+    executions: int
+    shared: int
+    wait_timeouts: int
+    leader_failures: int
+    coalescing_ratio: float
@@ -0,0 +1,71 @@
+import os
+import threading
+
+# Single-flight coalescing for expensive read computations. Concurrent calls with
+# the same name and key share one execution: the first caller runs it, later
+# callers wait for its result instead of repeating the work. Waiting is bounded by
+# SINGLEFLIGHT_WAIT_SECONDS; a caller that waits longer, or whose leader failed,
+# runs the computation itself. Flights live in the process, so coalescing happens
+# per API worker process.
+# Shared results are handed to every waiter as-is and must not be mutated.
+
+SINGLEFLIGHT_WAIT_SECONDS = float(os.getenv("SINGLEFLIGHT_WAIT_SECONDS", "10"))
+
+COUNTERS = ("calls", "executions", "shared", "wait_timeouts", "leader_failures")
+
+_flights = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+def _count(name: str, counter: str):
+    with _lock:
+        _stats.setdefault(name, dict.fromkeys(COUNTERS, 0))[counter] += 1
+
+def stats():
+    with _lock:
+        return {
+            name: dict(counters, coalescing_ratio=round(counters["shared"] / counters["calls"], 4) if counters["calls"] else 0.0)
+            for name, counters in _stats.items()
+        }
+
+def _execute(name: str, fn):
+    _count(name, "executions")
+    return fn()
+
+def run(name: str, key, fn):
+    with _lock:
+        _stats.setdefault(name, dict.fromkeys(COUNTERS, 0))["calls"] += 1
+        flight = _flights.get((name, key))
+        leader = flight is None
+        if leader:
+            flight = _flights[(name, key)] = _Flight()
+
+    if leader:
+        try:
+            flight.result = _execute(name, fn)
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with _lock:
+                _flights.pop((name, key), None)
+            flight.done.set()
+        return flight.result
+
+    if not flight.done.wait(SINGLEFLIGHT_WAIT_SECONDS):
+        _count(name, "wait_timeouts")
+        return _execute(name, fn)
+    if flight.failed:
+        # The leader's failure may be its own (cancelled, timed out), so retry alone
+        _count(name, "leader_failures")
+        return _execute(name, fn)
+    _count(name, "shared")
+    return flight.result
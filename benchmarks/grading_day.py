@@ -0,0 +1,139 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Grading-day benchmark for the embedded SQLite backend.
+# Seeds a full school into a fresh WAL database, then replays a day of teacher mark
+# entry and corrections interleaved with dashboard reads through the crud layer, on
+# one thread pinned to one core, and reports throughput and latency per operation.
+#
+#   python benchmarks/grading_day.py [--classes 30] [--students-per-class 35] [--subjects 12]
+
+def _pin_to_one_core():
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+def _configure(path: str):
+    # Must run before backend.database is imported: engines are built at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    for name in ("SCHOOL_DATABASES", "SCHOOL_REPLICAS", "REPLICA_DATABASE_URL"):
+        os.environ.pop(name, None)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(db, classes: int, students_per_class: int, subjects: int):
+    from sqlalchemy import insert, select
+    from backend.auth import get_password_hash
+    from backend.models import User, Student, Teacher, Subject, Enrollment
+
+    # One hash for everyone: bcrypt per user would dominate the seed time
+    password_hash = get_password_hash("benchmark")
+    db.execute(insert(User), [
+        {"name": f"Teacher {t}", "email": f"teacher{t}@school.test", "password_hash": password_hash, "role": "teacher"}
+        for t in range(subjects)
+    ])
+    db.execute(insert(User), [
+        {"name": f"Student {s}", "email": f"student{s}@school.test", "password_hash": password_hash, "role": "student"}
+        for s in range(classes * students_per_class)
+    ])
+    teacher_users = db.execute(select(User.id).where(User.role == "teacher").order_by(User.id)).scalars().all()
+    student_users = db.execute(select(User.id).where(User.role == "student").order_by(User.id)).scalars().all()
+
+    db.execute(insert(Teacher), [{"user_id": uid} for uid in teacher_users])
+    db.execute(insert(Student), [
+        {"user_id": uid, "class_name": f"C{i // students_per_class:02d}", "roll_number": f"R{i:05d}"}
+        for i, uid in enumerate(student_users)
+    ])
+    teacher_ids = db.execute(select(Teacher.id).order_by(Teacher.id)).scalars().all()
+    db.execute(insert(Subject), [{"name": f"Subject {i}", "teacher_id": tid} for i, tid in enumerate(teacher_ids)])
+    subject_ids = db.execute(select(Subject.id).order_by(Subject.id)).scalars().all()
+    student_ids = db.execute(select(Student.id).order_by(Student.id)).scalars().all()
+    # Every student takes every subject, each subject taught by one teacher
+    db.execute(insert(Enrollment), [{"student_id": st, "subject_id": su} for st in student_ids for su in subject_ids])
+    db.commit()
+    return list(zip(teacher_users, subject_ids)), list(zip(student_users, student_ids))
+
+
+def run_day(db, teachers, students, correction_rate: float, reads_per_write: int, seed_value: int):
+    from backend import crud
+    from backend.schemas import MarkCreate, MarkUpdate
+
+    rng = random.Random(seed_value)
+    timings = {"create_mark": [], "update_mark": [], "student_stats": [], "teacher_averages": [], "leaderboard": []}
+
+    def timed(name, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        timings[name].append(time.perf_counter() - started)
+        return result
+
+    # Teachers take turns entering a class's marks, as they would through the day
+    entries = [(t_user, subject_id, s_user, student_id) for t_user, subject_id in teachers for s_user, student_id in students]
+    rng.shuffle(entries)
+    created = []
+    for n, (t_user, subject_id, s_user, student_id) in enumerate(entries, start=1):
+        mark = timed("create_mark", crud.teacher_create_mark, db,
+                     MarkCreate(student_id=student_id, subject_id=subject_id, marks=rng.randint(30, 100)), t_user)
+        created.append((mark.id, t_user))
+        if rng.random() < correction_rate:
+            mark_id, owner = rng.choice(created)
+            timed("update_mark", crud.teacher_update_mark, db, mark_id, MarkUpdate(marks=rng.randint(30, 100)), owner)
+        if n % reads_per_write == 0:
+            timed("student_stats", crud.student_get_my_stats, db, rng.choice(students)[0])
+            timed("teacher_averages", crud.teacher_get_subject_averages, db, t_user)
+        if n % (reads_per_write * 50) == 0:
+            timed("leaderboard", crud.get_leaderboard, db)
+    return timings
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grading-day benchmark on the SQLite backend")
+    parser.add_argument("--classes", type=int, default=30)
+    parser.add_argument("--students-per-class", type=int, default=35)
+    parser.add_argument("--subjects", type=int, default=12)
+    parser.add_argument("--correction-rate", type=float, default=0.1, help="share of entries followed by a correction")
+    parser.add_argument("--reads-per-write", type=int, default=5, help="dashboard reads after every N mark entries")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database", help="SQLite file to use (default: a temporary file)")
+    args = parser.parse_args(argv)
+
+    _pin_to_one_core()
+    workdir = None
+    if args.database:
+        path = args.database
+    else:
+        workdir = tempfile.TemporaryDirectory()
+        path = os.path.join(workdir.name, "grading_day.db")
+    _configure(path)
+
+    from backend import models
+    from backend.database import engine, SessionLocal
+
+    models.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        teachers, students = seed(db, args.classes, args.students_per_class, args.subjects)
+        print(f"Seeded {len(students)} students, {len(teachers)} subjects in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        timings = run_day(db, teachers, students, args.correction_rate, args.reads_per_write, args.seed)
+        elapsed = time.perf_counter() - started
+
+    operations = sum(len(v) for v in timings.values())
+    print(f"{operations} operations in {elapsed:.1f}s ({operations / elapsed:.0f} ops/s) on one core")
+    print(f"{'operation':<18}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, values in timings.items():
+        if values:
+            print(f"{name:<18}{len(values):>8}{_percentile(values, 0.5) * 1000:>10.2f}{_percentile(values, 0.99) * 1000:>10.2f}")
+    if workdir:
+        engine.dispose()
+        workdir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from grading_day import seed, _configure, _pin_to_one_core, _percentile
+
+# Microbenchmark for the per-request identity and ownership lookups.
+# Times each lookup built per call with the Query API against the cached statements
+# the crud layer now uses, on the same seeded SQLite database. Both sides run the
+# same SQL, so the difference is the per-call statement construction and compile
+# overhead; teacher_subjects_2q is the old two-query version, for reference.
+#
+#   python benchmarks/hot_lookups.py [--iterations 20000]
+
+def legacy_lookups():
+    from sqlalchemy import exists
+    from backend.models import User, Teacher, Subject, Mark
+
+    def user_by_email(db, email):
+        return db.query(User).filter(User.email == email).first()
+
+    def teacher_subjects(db, teacher_user_id):
+        return db.query(Subject).join(Teacher, Teacher.id == Subject.teacher_id).filter(Teacher.user_id == teacher_user_id).all()
+
+    def teacher_subjects_2q(db, teacher_user_id):
+        teacher = db.query(Teacher).filter(Teacher.user_id == teacher_user_id).first()
+        if not teacher: return []
+        return db.query(Subject).filter(Subject.teacher_id == teacher.id).all()
+
+    def mark_exists(db, mark_id):
+        return db.query(exists().where(Mark.id == mark_id)).scalar()
+
+    return {"user_by_email": user_by_email, "teacher_subjects": teacher_subjects, "mark_exists": mark_exists,
+            "teacher_subjects_2q": teacher_subjects_2q}
+
+def cached_lookups():
+    from backend import auth, crud
+    return {"user_by_email": auth.user_by_email, "teacher_subjects": crud.teacher_get_my_subjects, "mark_exists": crud._mark_exists}
+
+def run(db, lookups, args_for, iterations: int, rng):
+    timings = {name: [] for name in lookups}
+    for _ in range(iterations):
+        for name, fn in lookups.items():
+            started = time.perf_counter()
+            fn(db, *args_for[name](rng))
+            timings[name].append(time.perf_counter() - started)
+        db.rollback()
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Identity and ownership lookup microbenchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--students-per-class", type=int, default=30)
+    parser.add_argument("--subjects", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    _pin_to_one_core()
+    workdir = tempfile.TemporaryDirectory()
+    _configure(os.path.join(workdir.name, "hot_lookups.db"))
+
+    from backend import models
+    from backend.database import engine, SessionLocal
+
+    models.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        teachers, students = seed(db, args.classes, args.students_per_class, args.subjects)
+        emails = [email for (email,) in db.query(models.User.email)]
+        args_for = {
+            "user_by_email": lambda rng: (rng.choice(emails),),
+            "teacher_subjects": lambda rng: (rng.choice(teachers)[0],),
+            "teacher_subjects_2q": lambda rng: (rng.choice(teachers)[0],),
+            "mark_exists": lambda rng: (rng.randint(1, 1000),),
+        }
+        results = {}
+        for label, lookups in (("legacy", legacy_lookups()), ("cached", cached_lookups())):
+            run(db, lookups, args_for, 200, random.Random(args.seed))  # warm up caches
+            results[label] = run(db, lookups, args_for, args.iterations, random.Random(args.seed))
+
+    print(f"{'lookup':<18}{'legacy p50 us':>15}{'cached p50 us':>15}{'legacy p99 us':>15}{'cached p99 us':>15}")
+    for name in results["legacy"]:
+        legacy, cached = results["legacy"][name], results["cached"].get(name)
+        if cached is None:
+            print(f"{name:<18}{_percentile(legacy, 0.5) * 1e6:>15.1f}{'':>15}{_percentile(legacy, 0.99) * 1e6:>15.1f}")
+            continue
+        print(f"{name:<18}"
+              f"{_percentile(legacy, 0.5) * 1e6:>15.1f}{_percentile(cached, 0.5) * 1e6:>15.1f}"
+              f"{_percentile(legacy, 0.99) * 1e6:>15.1f}{_percentile(cached, 0.99) * 1e6:>15.1f}")
+    engine.dispose()
+    workdir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
 -- Drop existing schema carefully to handle dependencies
+DROP TABLE IF EXISTS audit_events CASCADE;
+DROP TABLE IF EXISTS jobs CASCADE;
+DROP TABLE IF EXISTS archived_marks CASCADE;
+DROP TABLE IF EXISTS enrollments CASCADE;
 DROP TABLE IF EXISTS marks CASCADE;
 DROP TABLE IF EXISTS subjects CASCADE;
 DROP TABLE IF EXISTS students CASCADE;
@@ -22,6 +26,15 @@ CREATE TABLE students (
     roll_number VARCHAR(50) UNIQUE NOT NULL
 );
 
+-- Roster search indexes (prefix via lower(), substring/fuzzy via pg_trgm)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX ix_users_name_prefix ON users (lower(name) text_pattern_ops);
+CREATE INDEX ix_users_email_prefix ON users (lower(email) text_pattern_ops);
+CREATE INDEX ix_students_roll_number_prefix ON students (lower(roll_number) text_pattern_ops);
+CREATE INDEX ix_users_name_trgm ON users USING gin (name gin_trgm_ops);
+CREATE INDEX ix_users_email_trgm ON users USING gin (email gin_trgm_ops);
+CREATE INDEX ix_students_roll_number_trgm ON students USING gin (roll_number gin_trgm_ops);
+
 -- Table: teachers
 CREATE TABLE teachers (
     id SERIAL PRIMARY KEY,
@@ -34,6 +47,7 @@ CREATE TABLE subjects (
     name VARCHAR(255) UNIQUE NOT NULL,
     teacher_id INTEGER REFERENCES teachers(id) ON DELETE SET NULL
 );
+CREATE INDEX ix_subjects_teacher_id ON subjects(teacher_id);
 
 -- Table: marks
 CREATE TABLE marks (
@@ -45,3 +59,63 @@ CREATE TABLE marks (
     UNIQUE(student_id, subject_id) -- A student can only have one mark entry per subject
 );
 
+-- Table: enrollments (which students take which subject)
+CREATE TABLE enrollments (
+    id SERIAL PRIMARY KEY,
+    student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+    subject_id INTEGER NOT NULL REFERENCES subjects(id) ON DELETE CASCADE,
+    CONSTRAINT uq_enrollment_student_subject UNIQUE(student_id, subject_id)
+);
+CREATE INDEX ix_enrollments_subject_student ON enrollments(subject_id, student_id);
+
+-- Table: archived_marks (denormalized marks of deleted/graduated students and retired subjects)
+CREATE TABLE archived_marks (
+    id SERIAL PRIMARY KEY,
+    student_id INTEGER NOT NULL,
+    student_name VARCHAR(255) NOT NULL,
+    roll_number VARCHAR(50) NOT NULL,
+    class_name VARCHAR(100) NOT NULL,
+    subject_id INTEGER NOT NULL,
+    subject_name VARCHAR(255) NOT NULL,
+    marks NUMERIC(5, 2) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ix_archived_marks_student_id ON archived_marks(student_id);
+CREATE INDEX ix_archived_marks_class_name ON archived_marks(class_name);
+
+-- Table: jobs (background analytics / report jobs)
+CREATE TABLE jobs (
+    id SERIAL PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL, -- queued, running, succeeded, failed, cancelled
+    progress INTEGER NOT NULL DEFAULT 0,
+    owner_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    params TEXT,
+    result BYTEA,
+    result_media_type VARCHAR(100),
+    result_filename VARCHAR(255),
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    worker VARCHAR(100), -- host:pid of the process running the job
+    heartbeat_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX ix_jobs_status ON jobs(status);
+CREATE INDEX ix_jobs_owner_id ON jobs(owner_id);
+
+-- Table: audit_events (who changed which mark / roster entry; written in batches)
+CREATE TABLE audit_events (
+    id SERIAL PRIMARY KEY,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    actor_id INTEGER, -- no FK: the trail outlives deleted users
+    actor_role VARCHAR(50),
+    action VARCHAR(50) NOT NULL,
+    entity_type VARCHAR(50) NOT NULL,
+    entity_id INTEGER,
+    details TEXT
+);
+CREATE INDEX ix_audit_events_actor_time ON audit_events(actor_id, created_at);
+CREATE INDEX ix_audit_events_entity_time ON audit_events(entity_type, entity_id, created_at);
+CREATE INDEX ix_audit_events_created_at ON audit_events(created_at);
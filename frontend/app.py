@@ -1,4 +1,5 @@
 import os
+import time
 import requests
 from flask import Flask, render_template, request, redirect, url_for, session, flash
 from functools import wraps
@@ -10,6 +11,10 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "super-secret-flask-key")
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000/api")
+# API address as seen from the browser (analytics pages call it directly)
+PUBLIC_API_BASE_URL = os.getenv("PUBLIC_API_BASE_URL", API_BASE_URL)
+# Browser tokens are re-minted when less than this many seconds remain
+BROWSER_TOKEN_REFRESH_MARGIN = 60
 
 # --- Decorators ---
 def login_required(f):
@@ -35,6 +40,27 @@ def role_required(roles):
 def get_headers():
     return {"Authorization": f"Bearer {session.get('token')}"}
 
+def browser_token():
+    # Short-lived, read-only analytics token for the browser, cached in the session
+    # until it is close to expiring. Returns (token, expires_at, status code).
+    if session.get('browser_token_expires_at', 0) - BROWSER_TOKEN_REFRESH_MARGIN > time.time():
+        return session['browser_token'], session['browser_token_expires_at'], 200
+    try:
+        response = requests.post(f"{API_BASE_URL}/auth/browser-token", headers=get_headers(), timeout=5)
+    except requests.exceptions.ConnectionError:
+        return None, 0, 502
+    if response.status_code != 200:
+        return None, 0, response.status_code
+    data = response.json()
+    session['browser_token'] = data['access_token']
+    session['browser_token_expires_at'] = int(time.time()) + data['expires_in']
+    return session['browser_token'], session['browser_token_expires_at'], 200
+
+def analytics_api_config():
+    # Passed to analytics_api.js; the page renders without waiting for any analytics query
+    token, expires_at, _ = browser_token()
+    return {"base_url": PUBLIC_API_BASE_URL, "token": token, "expires_at": expires_at, "refresh_url": url_for('refresh_browser_token')}
+
 # --- Common Routes ---
 
 @app.route("/", methods=["GET", "POST"])
@@ -45,9 +71,12 @@ def login():
     if request.method == "POST":
         email = request.form.get("email")
         password = request.form.get("password")
+        school = request.form.get("school")
         
         data = {"username": email, "password": password}
-        response = requests.post(f"{API_BASE_URL}/auth/login", data=data)
+        # The issued token carries the school, so the header is only needed here
+        login_headers = {"X-School": school} if school else {}
+        response = requests.post(f"{API_BASE_URL}/auth/login", data=data, headers=login_headers)
         
         if response.status_code == 200:
             token_data = response.json()
@@ -64,6 +93,16 @@ def login():
             
     return render_template("login.html")
 
+@app.route("/browser-token")
+@login_required
+def refresh_browser_token():
+    token, expires_at, status = browser_token()
+    if status == 401:
+        session.clear()
+    if not token:
+        return {"detail": "Could not obtain an API token"}, status
+    return {"token": token, "expires_at": expires_at}
+
 @app.route("/logout")
 def logout():
     session.clear()
@@ -124,6 +163,13 @@ def admin_students():
             res = requests.post(f"{API_BASE_URL}/admin/students/", json=data, headers=get_headers())
             if res.status_code == 200:
                 flash("Student added successfully!", "success")
+                # Teachers only see (and can grade) students enrolled in their subjects
+                student_id = res.json()["id"]
+                for subject_id in request.form.getlist("subject_ids"):
+                    enroll = {"student_id": student_id, "subject_id": int(subject_id)}
+                    res = requests.post(f"{API_BASE_URL}/admin/enrollments/", json=enroll, headers=get_headers())
+                    if res.status_code != 200:
+                        flash(f"Error enrolling student: {res.text}", "danger")
             else:
                 flash(f"Error adding student: {res.text}", "danger")
         elif action == "delete":
@@ -135,9 +181,11 @@ def admin_students():
                 flash(f"Error deleting student: {res.text}", "danger")
         return redirect(url_for('admin_students'))
 
-    students, redir = fetch_api(f"{API_BASE_URL}/admin/students/", fallback=[])
+    students, redir = fetch_api(f"{API_BASE_URL}/admin/students/?fields=id,user.name,user.email,class_name,roll_number", fallback=[])
     if redir: return redirect(url_for('login'))
-    return render_template("admin/students.html", students=students, role="admin")
+    subjects, redir2 = fetch_api(f"{API_BASE_URL}/admin/subjects/", fallback=[])
+    if redir2: return redirect(url_for('login'))
+    return render_template("admin/students.html", students=students, subjects=subjects, role="admin")
 
 @app.route("/admin/teachers", methods=["GET", "POST"])
 @login_required
@@ -199,23 +247,29 @@ def admin_subjects():
                     flash("Teacher assigned successfully!", "success")
                 else:
                     flash(f"Error assigning teacher: {res.text}", "danger")
+        elif action == "enroll_class":
+            data = {"class_name": request.form.get("class_name"), "subject_id": int(request.form.get("subject_id"))}
+            res = requests.post(f"{API_BASE_URL}/admin/enrollments/class", json=data, headers=get_headers())
+            if res.status_code == 200:
+                flash(f"Enrolled {res.json()['enrolled']} student(s) from {data['class_name']}.", "success")
+            else:
+                flash(f"Error enrolling class: {res.text}", "danger")
         return redirect(url_for('admin_subjects'))
 
     subjects, redir = fetch_api(f"{API_BASE_URL}/admin/subjects/", fallback=[])
     if redir: return redirect(url_for('login'))
     teachers, redir2 = fetch_api(f"{API_BASE_URL}/admin/teachers/", fallback=[])
     if redir2: return redirect(url_for('login'))
-    return render_template("admin/subjects.html", subjects=subjects, teachers=teachers, role="admin")
+    students, redir3 = fetch_api(f"{API_BASE_URL}/admin/students/?fields=class_name&limit=1000", fallback=[])
+    if redir3: return redirect(url_for('login'))
+    class_names = sorted({s["class_name"] for s in students})
+    return render_template("admin/subjects.html", subjects=subjects, teachers=teachers, class_names=class_names, role="admin")
 
 @app.route("/admin/analytics")
 @login_required
 @role_required(["admin"])
 def admin_analytics():
-    leaderboard, redir = fetch_api(f"{API_BASE_URL}/analytics/admin/leaderboard", fallback=[])
-    if redir: return redirect(url_for('login'))
-    subjects, redir2 = fetch_api(f"{API_BASE_URL}/analytics/admin/subjects", fallback=[])
-    if redir2: return redirect(url_for('login'))
-    return render_template("admin/analytics.html", leaderboard=leaderboard, subjects=subjects, role="admin")
+    return render_template("admin/analytics.html", api=analytics_api_config(), role="admin")
 
 # ==========================================
 # TEACHER ROUTES
@@ -239,7 +293,7 @@ def teacher_subjects():
 @login_required
 @role_required(["teacher"])
 def teacher_students():
-    students, redir = fetch_api(f"{API_BASE_URL}/teacher/students/", fallback=[])
+    students, redir = fetch_api(f"{API_BASE_URL}/teacher/students/?fields=id,user.name,class_name,roll_number", fallback=[])
     if redir: return redirect(url_for('login'))
     return render_template("teacher/students.html", students=students, role="teacher")
 
@@ -249,17 +303,28 @@ def teacher_students():
 def teacher_add_marks():
     subjects, redir = fetch_api(f"{API_BASE_URL}/teacher/subjects/", fallback=[])
     if redir: return redirect(url_for('login'))
-    students, redir2 = fetch_api(f"{API_BASE_URL}/teacher/students/", fallback=[])
-    if redir2: return redirect(url_for('login'))
-    return render_template("teacher/add_marks.html", subjects=subjects, students=students, role="teacher")
+    # Students are looked up as the teacher types (see teacher_search_students)
+    return render_template("teacher/add_marks.html", subjects=subjects, role="teacher")
+
+@app.route("/teacher/students/search")
+@login_required
+@role_required(["teacher"])
+def teacher_search_students():
+    # JSON proxy for the marks form typeahead, so the API token stays in the session
+    params = {"q": request.args.get("q", ""), "limit": 15}
+    if request.args.get("subject_id"):
+        params["subject_id"] = request.args.get("subject_id")
+    try:
+        response = requests.get(f"{API_BASE_URL}/teacher/students/search", params=params, headers=get_headers(), timeout=5)
+    except requests.exceptions.ConnectionError:
+        return {"detail": "Could not connect to the backend API"}, 502
+    return response.content, response.status_code, {"Content-Type": "application/json"}
 
 @app.route("/teacher/analytics")
 @login_required
 @role_required(["teacher"])
 def teacher_analytics():
-    subjects, redir = fetch_api(f"{API_BASE_URL}/analytics/teacher/subjects", fallback=[])
-    if redir: return redirect(url_for('login'))
-    return render_template("teacher/analytics.html", subjects=subjects, role="teacher")
+    return render_template("teacher/analytics.html", api=analytics_api_config(), role="teacher")
 
 # ==========================================
 # STUDENT ROUTES
@@ -275,7 +340,7 @@ def student_dashboard():
 @login_required
 @role_required(["student"])
 def student_marks():
-    marks, redir = fetch_api(f"{API_BASE_URL}/student/marks", fallback=[])
+    marks, redir = fetch_api(f"{API_BASE_URL}/student/marks?fields=subject.name,marks,created_at", fallback=[])
     if redir: return redirect(url_for('login'))
     return render_template("student/marks.html", marks=marks, role="student")
 
@@ -283,9 +348,7 @@ def student_marks():
 @login_required
 @role_required(["student"])
 def student_analytics():
-    stats, redir = fetch_api(f"{API_BASE_URL}/analytics/student/stats", fallback={})
-    if redir: return redirect(url_for('login'))
-    return render_template("student/analytics.html", stats=stats, role="student")
+    return render_template("student/analytics.html", api=analytics_api_config(), role="student")
 
 @app.route("/student/profile")
 @login_required
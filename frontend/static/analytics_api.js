@@ -0,0 +1,62 @@
+// Direct browser -> API access for the analytics pages. The page is rendered with
+// a short-lived, read-only token (config.token); it is refreshed through the Flask
+// app (config.refresh_url) shortly before it expires or when the API rejects it.
+function createAnalyticsApi(config) {
+    let token = config.token;
+    let expiresAt = config.expires_at || 0;
+    let refreshing = null;
+
+    function refresh() {
+        if (!refreshing) {
+            refreshing = fetch(config.refresh_url, { credentials: 'same-origin' })
+                .then(function (r) {
+                    if (r.status === 401) window.location.href = '/';
+                    if (!r.ok) throw new Error('Could not refresh the API token (' + r.status + ')');
+                    return r.json();
+                })
+                .then(function (data) {
+                    token = data.token;
+                    expiresAt = data.expires_at;
+                    return token;
+                })
+                .finally(function () { refreshing = null; });
+        }
+        return refreshing;
+    }
+
+    function getToken() {
+        if (token && expiresAt - 30 > Date.now() / 1000) return Promise.resolve(token);
+        return refresh();
+    }
+
+    function getJSON(path, retried) {
+        return getToken().then(function (t) {
+            return fetch(config.base_url + path, { headers: { 'Authorization': 'Bearer ' + t } });
+        }).then(function (r) {
+            if (r.status === 401 && !retried) {
+                token = null;
+                return getJSON(path, true);
+            }
+            if (!r.ok) throw new Error('API error ' + r.status);
+            return r.json();
+        });
+    }
+
+    function liveUrl() {
+        return getToken().then(t => config.base_url + '/analytics/live?access_token=' + encodeURIComponent(t));
+    }
+
+    return { getJSON: getJSON, liveUrl: liveUrl };
+}
+
+// Runs fn once the element scrolls into view (immediately without IntersectionObserver)
+function whenVisible(el, fn) {
+    if (!el || !window.IntersectionObserver) { fn(); return; }
+    const observer = new IntersectionObserver(function (entries) {
+        if (entries.some(e => e.isIntersecting)) {
+            observer.disconnect();
+            fn();
+        }
+    });
+    observer.observe(el);
+}
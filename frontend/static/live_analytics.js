@@ -0,0 +1,36 @@
+// Live analytics: subscribes to the API's Server-Sent Events stream and keeps
+// the page's leaderboard / subject rows in sync with "snapshot" and "delta" events.
+function applyDelta(rows, delta, key) {
+    if (!delta) return rows;
+    const byKey = new Map(rows.map(r => [r[key], r]));
+    (delta.remove || []).forEach(k => byKey.delete(k));
+    (delta.upsert || []).forEach(r => byKey.set(r[key], r));
+    return Array.from(byKey.values());
+}
+
+function connectLiveAnalytics(api, onUpdate) {
+    // The stream only checks the token when connecting, so a reconnect after the
+    // server closed the stream (or rejected an expired token) fetches a fresh one
+    if (!window.EventSource) return;
+    const state = {};
+    function open() {
+        api.liveUrl().then(function (url) {
+            const source = new EventSource(url);
+            source.addEventListener('snapshot', function (e) {
+                Object.assign(state, JSON.parse(e.data));
+                onUpdate(state);
+            });
+            source.addEventListener('delta', function (e) {
+                const delta = JSON.parse(e.data);
+                if (delta.leaderboard) state.leaderboard = applyDelta(state.leaderboard || [], delta.leaderboard, 'student_id');
+                if (delta.subjects) state.subjects = applyDelta(state.subjects || [], delta.subjects, 'subject_name');
+                onUpdate(state);
+            });
+            source.onerror = function () {
+                source.close();
+                setTimeout(open, 3000);
+            };
+        }).catch(function () { setTimeout(open, 10000); });
+    }
+    open();
+}
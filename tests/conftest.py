@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+
+# Two schools on local SQLite files, the first with a replica. Engines are built when
+# backend.database is imported, so the environment is set up before any backend import.
+_workdir = tempfile.mkdtemp(prefix="edu-analytics-tests-")
+os.environ["SCHOOL_DATABASES"] = ",".join(
+    f"{school}=sqlite:///{os.path.join(_workdir, school + '.db')}" for school in ("north", "south")
+)
+os.environ["SCHOOL_REPLICAS"] = f"north=sqlite:///{os.path.join(_workdir, 'north_replica.db')}"
+os.environ["DEFAULT_SCHOOL"] = "north"
+for name in ("DATABASE_URL", "REPLICA_DATABASE_URL"):
+    os.environ.pop(name, None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from backend import models, database
+from backend.auth import get_password_hash
+from backend.main import app
+
+PASSWORD = "secret123"
+PASSWORD_HASH = get_password_hash(PASSWORD) # bcrypt once, not per user
+
+for replica_engine in database.replica_engines.values():
+    models.Base.metadata.create_all(bind=replica_engine)
+
+
+@pytest.fixture(autouse=True)
+def clean_databases():
+    for school_engine in list(database.engines.values()) + list(database.replica_engines.values()):
+        with school_engine.begin() as conn:
+            for table in reversed(models.Base.metadata.sorted_tables):
+                conn.execute(delete(table))
+    database._replica_health.clear()
+    database._recent_writes.clear()
+    yield
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+@pytest.fixture
+def db():
+    with database.session_for("north") as session:
+        yield session
+
+
+# --- Builders ---
+
+def add_user(db, email, role, name=None):
+    user = models.User(name=name or email.split("@")[0], email=email, password_hash=PASSWORD_HASH, role=role)
+    db.add(user)
+    db.flush()
+    return user
+
+def add_teacher(db, email):
+    user = add_user(db, email, "teacher")
+    teacher = models.Teacher(user_id=user.id)
+    db.add(teacher)
+    db.flush()
+    return teacher
+
+def add_student(db, email, class_name="10A"):
+    user = add_user(db, email, "student")
+    student = models.Student(user_id=user.id, class_name=class_name, roll_number=email.split("@")[0].upper())
+    db.add(student)
+    db.flush()
+    return student
+
+def add_subject(db, name, teacher=None):
+    subject = models.Subject(name=name, teacher_id=teacher.id if teacher else None)
+    db.add(subject)
+    db.flush()
+    return subject
+
+def enroll(db, student, subject):
+    db.add(models.Enrollment(student_id=student.id, subject_id=subject.id))
+    db.flush()
+
+def login(client, email, school="north"):
+    response = client.post("/api/auth/login", data={"username": email, "password": PASSWORD}, headers={"X-School": school})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
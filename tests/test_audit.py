@@ -0,0 +1,74 @@
+import pytest
+
+from backend import audit, database, models
+from conftest import add_user, add_teacher, add_student, add_subject, enroll, login
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    # Events as handed to the write-behind buffer, in order
+    events = []
+    monkeypatch.setattr(audit, "record", lambda actor, action, entity_type, entity_id=None, details=None:
+                        events.append((action, entity_type, entity_id, details)))
+    return events
+
+@pytest.fixture
+def admin(client, db):
+    add_user(db, "admin@school.test", "admin")
+    db.commit()
+    return login(client, "admin@school.test")
+
+def _stored_events(**filters):
+    with database.session_for("north") as db:
+        return [(e.action, e.entity_type, e.entity_id) for e in audit.query_events(db, **filters)]
+
+
+def test_bulk_delete_audits_only_deleted_ids(client, db, admin, recorded):
+    student = add_student(db, "ann@school.test")
+    db.commit()
+    response = client.post("/api/admin/students/bulk-delete", json={"ids": [student.id, 999]}, headers=admin)
+    assert response.status_code == 200 and response.json()["students"] == 1
+    assert [event[:3] for event in recorded] == [("delete", "student", student.id)]
+
+def test_deleting_unknown_rows_audits_nothing(client, admin, recorded):
+    assert client.post("/api/admin/subjects/bulk-delete", json={"ids": [555]}, headers=admin).json()["subjects"] == 0
+    assert client.delete("/api/admin/teachers/444", headers=admin).status_code == 200
+    assert recorded == []
+
+def test_class_selection_is_one_event(client, db, admin, recorded):
+    for email in ("ann@school.test", "bob@school.test"):
+        add_student(db, email, class_name="10C")
+    db.commit()
+    client.post("/api/admin/students/bulk-delete", json={"class_name": "10C"}, headers=admin)
+    assert len(recorded) == 1
+    action, entity_type, entity_id, details = recorded[0]
+    assert (action, entity_type, entity_id) == ("delete", "student", None)
+    assert details["class_name"] == "10C" and details["students"] == 2 and "deleted_ids" not in details
+
+def test_missing_mark_delete_is_a_404_without_audit(client, db, recorded):
+    teacher = add_teacher(db, "teacher@school.test")
+    student = add_student(db, "ann@school.test")
+    math = add_subject(db, "Math", teacher)
+    enroll(db, student, math)
+    mark = models.Mark(student_id=student.id, subject_id=math.id, marks=60)
+    db.add(mark)
+    db.commit()
+    headers = login(client, "teacher@school.test")
+    assert client.delete("/api/teacher/marks/999", headers=headers).status_code == 404
+    assert recorded == []
+    assert client.delete(f"/api/teacher/marks/{mark.id}", headers=headers).status_code == 200
+    assert [event[:3] for event in recorded] == [("delete", "mark", mark.id)]
+
+
+def test_shutdown_flushes_buffered_events(db, monkeypatch):
+    # A long flush interval: without the shutdown flush nothing would be written yet
+    monkeypatch.setattr(audit, "AUDIT_FLUSH_INTERVAL_SECONDS", 60)
+    actor = audit.Actor("north", add_user(db, "admin@school.test", "admin").id, "admin")
+    db.commit()
+    written = audit.stats()["written"]
+    for entity_id in (1, 2, 3):
+        assert audit.record(actor, "shutdown-test", "student", entity_id)
+    audit.shutdown(timeout=5)
+    assert not audit._writer.is_alive()
+    assert audit.stats()["written"] - written == 3 and audit.stats()["buffered"] == 0
+    assert sorted(_stored_events(actor_id=actor.user_id)) == [("shutdown-test", "student", i) for i in (1, 2, 3)]
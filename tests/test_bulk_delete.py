@@ -0,0 +1,59 @@
+import pytest
+
+from backend import crud, models
+from conftest import add_teacher, add_student, add_subject, enroll
+
+
+@pytest.fixture
+def school(db):
+    teacher = add_teacher(db, "teacher@school.test")
+    math = add_subject(db, "Math", teacher)
+    art = add_subject(db, "Art", teacher)
+    students = [add_student(db, f"s{i}@school.test", class_name="10A" if i < 2 else "10B") for i in range(3)]
+    for student in students:
+        for subject in (math, art):
+            enroll(db, student, subject)
+            db.add(models.Mark(student_id=student.id, subject_id=subject.id, marks=50 + student.id))
+    db.commit()
+    return {"teacher": teacher.id, "math": math.id, "art": art.id, "students": [s.id for s in students]}
+
+def _count(db, model):
+    db.expire_all()
+    return db.query(model).count()
+
+
+def test_deleting_students_cascades_to_marks_and_enrollments(db, school):
+    result = crud.admin_bulk_delete_students(db, ids=[school["students"][0], 999])
+    assert result["students"] == 1
+    assert result["marks"] == 2 and result["enrollments"] == 2
+    assert result["deleted_ids"] == [school["students"][0]]
+    assert _count(db, models.Mark) == 4 and _count(db, models.Enrollment) == 4
+    # The login goes too
+    assert _count(db, models.User) == 3
+
+def test_deleting_a_class(db, school):
+    result = crud.admin_bulk_delete_students(db, class_name="10A")
+    assert result["students"] == 2 and result["marks"] == 4 and result["enrollments"] == 4
+    assert _count(db, models.Student) == 1
+
+def test_student_selection_is_required(db, school):
+    with pytest.raises(ValueError):
+        crud.admin_bulk_delete_students(db)
+
+def test_archiving_students_keeps_their_marks(db, school):
+    result = crud.admin_archive_students(db, ids=school["students"][:2])
+    assert result["students"] == 2 and result["archived_marks"] == 4
+    assert _count(db, models.ArchivedMark) == 4 and _count(db, models.Mark) == 2
+
+def test_deleting_subjects_cascades(db, school):
+    result = crud.admin_bulk_delete_subjects(db, [school["math"], 555])
+    assert result["subjects"] == 1 and result["marks"] == 3 and result["enrollments"] == 3
+    assert result["deleted_ids"] == [school["math"]]
+    assert _count(db, models.Mark) == 3
+
+def test_deleting_teachers_keeps_their_subjects(db, school):
+    result = crud.admin_bulk_delete_teachers(db, [school["teacher"], 444])
+    assert result == {"teachers": 1, "deleted_ids": [school["teacher"]]}
+    db.expire_all()
+    assert db.query(models.Subject).filter(models.Subject.teacher_id != None).count() == 0
+    assert _count(db, models.Mark) == 6
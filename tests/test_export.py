@@ -0,0 +1,85 @@
+import io
+import os
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.dataset
+import pyarrow.parquet
+
+from backend import database, export, models
+from conftest import add_user, add_teacher, add_student, add_subject, login
+
+
+@pytest.fixture(autouse=True)
+def primary_reads(monkeypatch):
+    # The test replica is never written to, so exports read the primary
+    monkeypatch.setattr(database, "replica_usable", lambda school: False)
+
+@pytest.fixture
+def marks(db):
+    teacher = add_teacher(db, "teacher@school.test")
+    math, art = add_subject(db, "Math", teacher), add_subject(db, "Art", teacher)
+    ann, bob = add_student(db, "ann@school.test"), add_student(db, "bob@school.test", class_name="10B")
+    for student, subject, value in ((ann, math, 91.5), (ann, art, 70), (bob, math, 64.25)):
+        db.add(models.Mark(student_id=student.id, subject_id=subject.id, marks=value))
+    db.commit()
+    return {"math": math.id, "art": art.id}
+
+def _rows(table):
+    return sorted((r["roll_number"], r["class_name"], r["subject_name"], float(r["marks"])) for r in table.to_pylist())
+
+EXPECTED = [("ANN", "10A", "Art", 70.0), ("ANN", "10A", "Math", 91.5), ("BOB", "10B", "Math", 64.25)]
+
+def _partitions(path):
+    return sorted(os.path.relpath(root, path) for root, dirs, files in os.walk(path) if files)
+
+
+# --- Streams ---
+
+def test_arrow_stream_round_trips(marks):
+    data = b"".join(export.stream_marks("north", "arrow"))
+    table = pa.ipc.open_stream(data).read_all()
+    assert table.schema == export.mark_schema()
+    assert _rows(table) == EXPECTED
+
+def test_parquet_stream_round_trips(marks):
+    data = b"".join(export.stream_marks("north", "parquet", subject_id=marks["math"]))
+    assert _rows(pa.parquet.read_table(io.BytesIO(data))) == [r for r in EXPECTED if r[2] == "Math"]
+
+def test_export_endpoint(client, db, marks):
+    add_user(db, "admin@school.test", "admin")
+    db.commit()
+    response = client.get("/api/admin/export/marks?format=arrow&class_name=10B", headers=login(client, "admin@school.test"))
+    assert response.status_code == 200
+    assert _rows(pa.ipc.open_stream(response.content).read_all()) == [EXPECTED[2]]
+
+
+# --- Snapshots ---
+
+def test_snapshot_rerun_drops_deleted_partitions(db, marks, tmp_path):
+    target = str(tmp_path / "latest")
+    export.write_snapshot(db, target)
+    assert _partitions(os.path.join(target, "marks")) == [
+        "class_name=10A/subject_name=Art", "class_name=10A/subject_name=Math", "class_name=10B/subject_name=Math",
+    ]
+    db.query(models.Mark).filter(models.Mark.subject_id == marks["art"]).delete()
+    db.commit()
+
+    export.write_snapshot(db, target)
+    assert _partitions(os.path.join(target, "marks")) == ["class_name=10A/subject_name=Math", "class_name=10B/subject_name=Math"]
+    assert _rows(pa.dataset.dataset(os.path.join(target, "marks"), partitioning="hive").to_table()) == [
+        r for r in EXPECTED if r[2] == "Math"
+    ]
+    assert sorted(os.listdir(target)) == sorted(export.SNAPSHOT_ENTRIES)
+    # No staging directories left behind
+    assert os.listdir(tmp_path) == ["latest"]
+
+def test_snapshot_refuses_a_foreign_directory(db, marks, tmp_path):
+    target = tmp_path / "reports"
+    target.mkdir()
+    (target / "notes.txt").write_text("keep me")
+    with pytest.raises(FileExistsError):
+        export.write_snapshot(db, str(target))
+    assert os.listdir(target) == ["notes.txt"] and (target / "notes.txt").read_text() == "keep me"
+    assert os.listdir(tmp_path) == ["reports"]
@@ -0,0 +1,52 @@
+import pytest
+from fastapi import HTTPException
+
+from backend import crud, database, fieldsets, models, schemas
+from conftest import add_user, add_teacher, add_student, add_subject, enroll, login
+
+
+@pytest.fixture(autouse=True)
+def primary_reads(monkeypatch):
+    # The test replica is never written to, so list reads go to the primary
+    monkeypatch.setattr(database, "replica_usable", lambda school: False)
+
+@pytest.fixture
+def admin(client, db):
+    add_user(db, "admin@school.com", "admin")
+    add_student(db, "ann@school.com")
+    add_student(db, "bob@school.com", class_name="10B")
+    db.commit()
+    return login(client, "admin@school.com")
+
+
+def test_trimmed_model_keeps_only_requested_fields():
+    model = fieldsets.trimmed_model(schemas.Student, ("id", "user.name"))
+    assert set(model.model_fields) == {"id", "user"}
+    assert set(model.model_fields["user"].annotation.model_fields) == {"name"}
+
+def test_unknown_field_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        fieldsets.parse_fields("id,password_hash", crud.STUDENT_FIELD_COLUMNS)
+    assert error.value.status_code == 400 and "password_hash" in error.value.detail
+    assert fieldsets.parse_fields(None, crud.STUDENT_FIELD_COLUMNS) is None
+
+def test_student_list_returns_only_requested_fields(client, admin):
+    response = client.get("/api/admin/students/?fields=roll_number,user.name", headers=admin)
+    assert response.status_code == 200
+    assert response.json() == [{"roll_number": "ANN", "user": {"name": "ann"}}, {"roll_number": "BOB", "user": {"name": "bob"}}]
+
+def test_full_student_list_without_fields(client, admin):
+    students = client.get("/api/admin/students/", headers=admin).json()
+    assert set(students[0]) == {"id", "user_id", "class_name", "roll_number", "user"}
+
+def test_unknown_field_on_endpoint_is_a_400(client, admin):
+    assert client.get("/api/admin/students/?fields=id,user.password_hash", headers=admin).status_code == 400
+
+def test_nested_mark_fields(client, db):
+    student = add_student(db, "ann@school.com")
+    math = add_subject(db, "Math", add_teacher(db, "teacher@school.com"))
+    enroll(db, student, math)
+    db.add(models.Mark(student_id=student.id, subject_id=math.id, marks=88))
+    db.commit()
+    response = client.get("/api/student/marks?fields=marks,subject.name", headers=login(client, "ann@school.com"))
+    assert response.json() == [{"marks": 88, "subject": {"name": "Math"}}]
@@ -0,0 +1,108 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from backend import database, jobs, models
+from conftest import add_user
+
+
+@pytest.fixture
+def owner(db):
+    user = add_user(db, "admin@school.test", "admin")
+    db.commit()
+    return user
+
+@pytest.fixture
+def gate(monkeypatch):
+    # A job that runs until the gate opens, stopping early if cancelled
+    opened = threading.Event()
+    started = []
+    def blocking_job(db, ctx):
+        started.append(ctx.job.id)
+        while not opened.wait(0.01):
+            ctx.check_cancelled()
+        return {"done": True}
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "blocking", (blocking_job, ("admin",)))
+    yield opened, started
+    opened.set()
+
+def _wait_for(job_id, states, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with database.session_for("north") as db:
+            job = jobs.get_job(db, job_id)
+            if job.status in states:
+                return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {states}")
+
+def _wait_started(started, job_id):
+    deadline = time.monotonic() + 5
+    while job_id not in started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job_id in started
+
+
+def test_cancelling_a_queued_job(db, owner, gate):
+    opened, started = gate
+    # Occupy every worker so the next job stays queued
+    busy = [jobs.submit(db, "blocking", owner) for _ in range(jobs.JOB_WORKERS)]
+    for job in busy:
+        _wait_started(started, job.id)
+    queued = jobs.submit(db, "blocking", owner)
+    assert jobs.cancel(db, queued).status == jobs.CANCELLED
+    opened.set()
+    for job in busy:
+        _wait_for(job.id, [jobs.SUCCEEDED])
+    assert queued.id not in started
+    assert _wait_for(queued.id, jobs.FINISHED_STATES).status == jobs.CANCELLED
+
+def test_cancelling_a_running_job(db, owner, gate):
+    opened, started = gate
+    job = jobs.submit(db, "blocking", owner)
+    _wait_started(started, job.id)
+    # The handler may already have stopped by the time cancel() reloads the job
+    assert jobs.cancel(db, job).status in (jobs.CANCELLING, jobs.CANCELLED)
+    finished = _wait_for(job.id, jobs.FINISHED_STATES)
+    assert finished.status == jobs.CANCELLED and finished.result is None
+
+def test_cancel_after_completion_keeps_the_result(db, owner, gate):
+    opened, started = gate
+    job = jobs.submit(db, "blocking", owner)
+    _wait_started(started, job.id)
+    db.refresh(job)
+    assert job.status == jobs.RUNNING
+    # The job finishes after the caller loaded it but before the cancel is written
+    opened.set()
+    _wait_for(job.id, [jobs.SUCCEEDED])
+    while ("north", job.id) in jobs._futures:
+        time.sleep(0.01)
+    assert job.status == jobs.RUNNING # stale
+    assert jobs.cancel(db, job).status == jobs.SUCCEEDED
+    assert job.result and ("north", job.id) not in jobs._cancel_requested
+
+
+def test_recovery_fails_only_stale_jobs(db, owner):
+    now = jobs._now()
+    def add_job(status, heartbeat_at, worker="other-host:1"):
+        job = models.Job(kind="leaderboard", status=status, progress=0, owner_id=owner.id, params="{}",
+                         worker=worker, heartbeat_at=heartbeat_at)
+        db.add(job)
+        db.flush()
+        return job.id
+    live = add_job(jobs.RUNNING, now)
+    live_queued = add_job(jobs.QUEUED, now - timedelta(seconds=jobs.JOB_STALE_SECONDS / 2))
+    stale = add_job(jobs.RUNNING, now - timedelta(seconds=jobs.JOB_STALE_SECONDS + 5))
+    legacy = add_job(jobs.CANCELLING, None, worker=None)
+    done = add_job(jobs.SUCCEEDED, now - timedelta(days=1))
+    db.commit()
+
+    assert jobs.recover_interrupted(db) == 2
+    db.expire_all()
+    status = {job.id: job.status for job in db.query(models.Job)}
+    assert status == {
+        live: jobs.RUNNING, live_queued: jobs.QUEUED,
+        stale: jobs.FAILED, legacy: jobs.FAILED, done: jobs.SUCCEEDED,
+    }
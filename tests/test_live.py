@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from backend import live
+
+
+@pytest.fixture
+def analytics(monkeypatch):
+    # The snapshot the hub computes; tests change it and call notify()
+    state = {"leaderboard": [{"student_id": 1, "average_marks": 70.0}], "subjects": [{"subject_name": "Math", "average_marks": 70.0}]}
+    monkeypatch.setattr(live, "_compute", lambda school, scope: {section: list(rows) for section, rows in state.items()})
+    monkeypatch.setattr(live, "LIVE_DEBOUNCE_SECONDS", 0)
+    live._hubs.clear()
+    yield state
+    live._hubs.clear()
+
+async def _next_event(queue):
+    return await asyncio.wait_for(queue.get(), timeout=2)
+
+
+# --- Diffs ---
+
+def test_diff_reports_changed_added_and_removed_rows():
+    old = {"leaderboard": [{"student_id": 1, "average_marks": 70.0}, {"student_id": 2, "average_marks": 60.0}],
+           "subjects": [{"subject_name": "Math", "average_marks": 65.0}]}
+    new = {"leaderboard": [{"student_id": 1, "average_marks": 75.0}, {"student_id": 3, "average_marks": 50.0}],
+           "subjects": [{"subject_name": "Math", "average_marks": 65.0}]}
+    assert live.diff_snapshots(old, new) == {
+        "leaderboard": {"upsert": [{"student_id": 1, "average_marks": 75.0}, {"student_id": 3, "average_marks": 50.0}], "remove": [2]},
+    }
+
+def test_diff_of_identical_snapshots_is_empty():
+    snapshot = {"subjects": [{"subject_name": "Art", "average_marks": 80.0}]}
+    assert live.diff_snapshots(snapshot, dict(snapshot)) == {}
+
+def test_diff_against_no_snapshot_upserts_everything():
+    new = {"subjects": [{"subject_name": "Art", "average_marks": 80.0}]}
+    assert live.diff_snapshots({}, new) == {"subjects": {"upsert": new["subjects"], "remove": []}}
+
+
+# --- Hub lifecycle ---
+
+def test_subscriber_gets_snapshot_then_deltas(analytics):
+    async def scenario():
+        hub = live._get_hub("north", "admin")
+        queue = await hub.subscribe()
+        assert await _next_event(queue) == ("snapshot", analytics)
+        analytics["subjects"] = [{"subject_name": "Math", "average_marks": 72.5}]
+        live.notify("north", teacher_user_id=0)
+        assert await _next_event(queue) == ("delta", {"subjects": {"upsert": analytics["subjects"], "remove": []}})
+        hub.unsubscribe(queue)
+        assert ("north", "admin") not in live._hubs
+    asyncio.run(scenario())
+
+def test_newcomer_joining_while_last_subscriber_leaves_still_gets_updates(analytics):
+    async def scenario():
+        hub = live._get_hub("north", "admin")
+        leaving = await hub.subscribe()
+        # A newcomer has been handed the hub but is still inside subscribe() ...
+        newcomer_hub = live._get_hub("north", "admin")
+        await hub.lock.acquire()
+        joining = asyncio.ensure_future(newcomer_hub.subscribe())
+        await asyncio.sleep(0)
+        # ... when the last subscriber leaves: the hub must stay registered
+        hub.unsubscribe(leaving)
+        assert live._hubs[("north", "admin")] is hub
+        hub.lock.release()
+        queue = await joining
+        assert (await _next_event(queue))[0] == "snapshot"
+
+        analytics["leaderboard"] = [{"student_id": 1, "average_marks": 90.0}]
+        live.notify("north", teacher_user_id=0)
+        assert await _next_event(queue) == ("delta", {"leaderboard": {"upsert": analytics["leaderboard"], "remove": []}})
+        hub.unsubscribe(queue)
+        assert not live._hubs
+    asyncio.run(scenario())
+
+def test_notify_reaches_only_matching_scopes(analytics):
+    async def scenario():
+        own, other = live._get_hub("north", "teacher:7"), live._get_hub("north", "teacher:8")
+        own_queue, other_queue = await own.subscribe(), await other.subscribe()
+        await _next_event(own_queue), await _next_event(other_queue)
+        analytics["subjects"] = [{"subject_name": "Math", "average_marks": 99.0}]
+        live.notify("north", teacher_user_id=7)
+        assert (await _next_event(own_queue))[0] == "delta"
+        await asyncio.sleep(0.05)
+        assert other_queue.empty()
+    asyncio.run(scenario())
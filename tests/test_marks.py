@@ -0,0 +1,104 @@
+import pytest
+
+from backend import crud, models
+from backend.schemas import MarkCreate, MarkUpdate
+from conftest import add_teacher, add_student, add_subject, enroll, login
+
+
+@pytest.fixture
+def school(db):
+    owner = add_teacher(db, "owner@school.test")
+    other = add_teacher(db, "other@school.test")
+    math = add_subject(db, "Math", owner)
+    art = add_subject(db, "Art", other)
+    enrolled = add_student(db, "enrolled@school.test")
+    not_enrolled = add_student(db, "not-enrolled@school.test")
+    enroll(db, enrolled, math)
+    enroll(db, enrolled, art)
+    db.commit()
+    return {
+        "owner": owner.user_id, "other": other.user_id, "math": math.id, "art": art.id,
+        "enrolled": enrolled.id, "not_enrolled": not_enrolled.id,
+    }
+
+def _stored_marks(db, mark_id):
+    db.expire_all()
+    return db.query(models.Mark.marks).filter(models.Mark.id == mark_id).scalar()
+
+
+# --- Create ---
+
+def test_owner_creates_mark(db, school):
+    mark = crud.teacher_create_mark(db, MarkCreate(student_id=school["enrolled"], subject_id=school["math"], marks=81.5), school["owner"])
+    assert mark.id and float(mark.marks) == 81.5
+    assert float(_stored_marks(db, mark.id)) == 81.5
+
+def test_non_owner_cannot_create_mark(db, school):
+    with pytest.raises(ValueError):
+        crud.teacher_create_mark(db, MarkCreate(student_id=school["enrolled"], subject_id=school["math"], marks=50), school["other"])
+    assert db.query(models.Mark).count() == 0
+
+def test_cannot_create_mark_for_student_not_enrolled(db, school):
+    with pytest.raises(ValueError):
+        crud.teacher_create_mark(db, MarkCreate(student_id=school["not_enrolled"], subject_id=school["math"], marks=50), school["owner"])
+    assert db.query(models.Mark).count() == 0
+
+
+# --- Update ---
+
+@pytest.fixture
+def mark_id(db, school):
+    return crud.teacher_create_mark(db, MarkCreate(student_id=school["enrolled"], subject_id=school["math"], marks=60), school["owner"]).id
+
+def test_owner_updates_mark(db, school, mark_id):
+    updated = crud.teacher_update_mark(db, mark_id, MarkUpdate(marks=75), school["owner"])
+    assert float(updated.marks) == 75
+    assert float(_stored_marks(db, mark_id)) == 75
+
+def test_non_owner_cannot_update_mark(db, school, mark_id):
+    with pytest.raises(ValueError):
+        crud.teacher_update_mark(db, mark_id, MarkUpdate(marks=99), school["other"])
+    assert float(_stored_marks(db, mark_id)) == 60
+
+def test_cannot_update_mark_after_unenrollment(db, school, mark_id):
+    db.query(models.Enrollment).filter(models.Enrollment.student_id == school["enrolled"], models.Enrollment.subject_id == school["math"]).delete()
+    db.commit()
+    with pytest.raises(ValueError):
+        crud.teacher_update_mark(db, mark_id, MarkUpdate(marks=99), school["owner"])
+    assert float(_stored_marks(db, mark_id)) == 60
+
+def test_update_of_missing_mark_returns_none(db, school):
+    assert crud.teacher_update_mark(db, 999, MarkUpdate(marks=50), school["owner"]) is None
+
+
+# --- Delete ---
+
+def test_owner_deletes_mark(db, school, mark_id):
+    assert crud.teacher_delete_mark(db, mark_id, school["owner"]) is True
+    assert _stored_marks(db, mark_id) is None
+
+def test_non_owner_cannot_delete_mark(db, school, mark_id):
+    with pytest.raises(ValueError):
+        crud.teacher_delete_mark(db, mark_id, school["other"])
+    assert _stored_marks(db, mark_id) is not None
+
+def test_cannot_delete_mark_after_unenrollment(db, school, mark_id):
+    db.query(models.Enrollment).filter(models.Enrollment.student_id == school["enrolled"], models.Enrollment.subject_id == school["math"]).delete()
+    db.commit()
+    with pytest.raises(ValueError):
+        crud.teacher_delete_mark(db, mark_id, school["owner"])
+    assert _stored_marks(db, mark_id) is not None
+
+def test_delete_of_missing_mark_returns_none(db, school):
+    assert crud.teacher_delete_mark(db, 999, school["owner"]) is None
+
+
+# --- Through the API ---
+
+def test_mark_endpoints_map_outcomes_to_status_codes(client, db, school, mark_id):
+    owner, other = login(client, "owner@school.test"), login(client, "other@school.test")
+    assert client.put(f"/api/teacher/marks/{mark_id}", json={"marks": 70}, headers=other).status_code == 403
+    assert client.put("/api/teacher/marks/999", json={"marks": 70}, headers=owner).status_code == 404
+    assert client.delete(f"/api/teacher/marks/{mark_id}", headers=other).status_code == 403
+    assert client.delete("/api/teacher/marks/999", headers=owner).status_code == 404
+    assert client.delete(f"/api/teacher/marks/{mark_id}", headers=owner).status_code == 200
@@ -0,0 +1,183 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from starlette.concurrency import run_in_threadpool
+
+from backend import crud, database, query_budget
+from backend.database import QueryScope
+from conftest import add_user, login
+
+# Never finishes on its own: only a deadline or a cancel stops it
+ENDLESS_QUERY = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c")
+
+
+def _counter(label, name):
+    return query_budget.stats()[label][name]
+
+@pytest.fixture
+def admin(client, db):
+    add_user(db, "admin@school.test", "admin")
+    db.commit()
+    return login(client, "admin@school.test")
+
+@pytest.fixture
+def leaderboard_query(monkeypatch):
+    # Replace the admin leaderboard's query; set "run" to a function of the session
+    behaviour = {}
+    monkeypatch.setattr(crud, "get_leaderboard", lambda db: behaviour["run"](db))
+    return behaviour
+
+
+# --- SQLite deadline ---
+
+def test_sqlite_statement_is_interrupted_at_its_deadline():
+    started = time.monotonic()
+    with database.session_for("north", QueryScope(100, "test")) as db:
+        with pytest.raises(OperationalError, match="interrupted"):
+            db.execute(ENDLESS_QUERY)
+    assert time.monotonic() - started < 2
+
+def test_unscoped_session_clears_the_previous_deadline():
+    with database.session_for("north", QueryScope(100, "test")) as db:
+        db.execute(text("SELECT 1"))
+        assert db.connection().info["statement_timeout_ms"] == 100
+    with database.session_for("north") as db:
+        db.execute(text("SELECT 1"))
+        assert db.connection().info["statement_timeout_ms"] is None
+
+def test_cancelled_scope_refuses_new_transactions():
+    scope = QueryScope(1000, "test")
+    scope.cancel()
+    with database.session_for("north", scope) as db:
+        with pytest.raises(database.QueryCancelled):
+            db.execute(text("SELECT 1"))
+
+
+# --- Error mapping ---
+
+def test_statement_timeout_is_a_504(client, admin, leaderboard_query, monkeypatch):
+    monkeypatch.setitem(query_budget.STATEMENT_TIMEOUTS_MS, "analytics", 100)
+    leaderboard_query["run"] = lambda db: db.execute(ENDLESS_QUERY).all()
+    timeouts = _counter("analytics", "timeouts")
+    response = client.get("/api/analytics/admin/leaderboard", headers=admin)
+    assert response.status_code == 504 and "analytics" in response.json()["detail"]
+    assert _counter("analytics", "timeouts") == timeouts + 1
+
+def test_exhausted_pool_is_a_503(client, admin, leaderboard_query):
+    def exhausted(db):
+        raise PoolTimeoutError("QueuePool limit reached")
+    leaderboard_query["run"] = exhausted
+    exhausted_before = _counter("analytics", "pool_exhausted")
+    response = client.get("/api/analytics/admin/leaderboard", headers=admin)
+    assert response.status_code == 503 and response.headers["Retry-After"] == str(query_budget.RETRY_AFTER_SECONDS)
+    assert _counter("analytics", "pool_exhausted") == exhausted_before + 1
+
+def test_unavailable_database_is_a_503(client, admin, leaderboard_query):
+    def unavailable(db):
+        raise OperationalError("SELECT 1", {}, Exception("unable to open database file"))
+    leaderboard_query["run"] = unavailable
+    unavailable_before = _counter("analytics", "unavailable")
+    assert client.get("/api/analytics/admin/leaderboard", headers=admin).status_code == 503
+    assert _counter("analytics", "unavailable") == unavailable_before + 1
+
+
+# --- Cancellation on disconnect ---
+
+def test_client_disconnect_cancels_the_running_query():
+    outcome = {}
+
+    async def endpoint(scope, receive, send):
+        query_scope = scope["state"]["query_scope"]
+        def run():
+            with database.session_for("north", query_scope) as db:
+                db.execute(ENDLESS_QUERY)
+        try:
+            await run_in_threadpool(run)
+        except OperationalError as e:
+            outcome["error"] = str(e.orig)
+        outcome["cancelled"] = query_scope.cancelled
+        await send({"type": "http.response.start", "status": 503, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(0.1) # the client goes away mid-query
+        return {"type": "http.disconnect"}
+    async def send(message):
+        pass
+
+    cancelled = _counter("crud", "cancelled")
+    started = time.monotonic()
+    scope = {"type": "http", "path": "/api/teacher/students/", "method": "GET", "headers": []}
+    asyncio.run(query_budget.QueryBudgetMiddleware(endpoint)(scope, receive, send))
+    assert outcome == {"error": "interrupted", "cancelled": True}
+    assert time.monotonic() - started < 2
+    assert _counter("crud", "cancelled") == cancelled + 1
+
+
+# --- PostgreSQL statement_timeout ---
+
+class FakePgConnection:
+    # Just enough of a SQLAlchemy Connection over a psycopg connection
+    class Dialect:
+        name = "postgresql"
+
+    class DBAPIConnection:
+        def __init__(self, sent):
+            self.sent = sent
+            self.autocommit = False
+            self.info = type("ConnectionInfo", (), {"transaction_status": 0})()
+
+        def cursor(self):
+            connection = self
+            class Cursor:
+                def execute(self, sql):
+                    connection.sent.append((sql, connection.autocommit))
+                def close(self):
+                    pass
+            return Cursor()
+
+    def __init__(self):
+        self.sent = []
+        self.info = {}
+        self.dialect = self.Dialect()
+        self.dbapi_connection = self.DBAPIConnection(self.sent)
+        self.connection = self # pool proxy: .dbapi_connection
+
+    def exec_driver_sql(self, sql):
+        self.sent.append((sql, "in transaction"))
+
+class FakeSession:
+    def __init__(self, scope=None):
+        self.info = {"query_scope": scope} if scope else {}
+
+def _begin(connection, scope=None):
+    database._begin_query_scope(FakeSession(scope), None, connection)
+
+def test_pg_timeout_is_only_sent_when_the_budget_changes():
+    connection = FakePgConnection()
+    _begin(connection, QueryScope(2000))
+    _begin(connection, QueryScope(2000))
+    _begin(connection, QueryScope(15000))
+    # Unscoped sessions (jobs, scripts) reset what a request left behind, once
+    _begin(connection)
+    _begin(connection)
+    assert connection.sent == [
+        ("SET statement_timeout = 2000", True),
+        ("SET statement_timeout = 15000", True),
+        ("SET statement_timeout = 0", True),
+    ]
+    assert connection.dbapi_connection.autocommit is False
+
+def test_pg_timeout_inside_an_open_transaction_is_local():
+    connection = FakePgConnection()
+    connection.dbapi_connection.info.transaction_status = 2
+    _begin(connection, QueryScope(2000))
+    assert connection.sent == [("SET LOCAL statement_timeout = 2000", "in transaction")]
+    # Not remembered: the next transaction sets it again
+    assert "pg_statement_timeout_ms" not in connection.info
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from backend import database
+from conftest import add_user, login
+
+
+@pytest.fixture
+def lag(monkeypatch):
+    # Replica lag as reported by the health probe; set to an exception to fail the probe
+    state = {"value": 0.0, "probes": 0}
+    def probe(replica_engine):
+        state["probes"] += 1
+        if isinstance(state["value"], Exception):
+            raise state["value"]
+        return state["value"]
+    monkeypatch.setattr(database, "replica_lag_seconds", probe)
+    return state
+
+def _is_replica(school, subject=None):
+    with database.read_session_for(school, subject) as db:
+        return bool(db.info.get("replica"))
+
+
+def test_reads_go_to_a_healthy_replica(lag):
+    assert _is_replica("north")
+
+def test_lagging_replica_falls_back_to_primary(lag):
+    lag["value"] = database.REPLICA_MAX_LAG_SECONDS + 1
+    assert not _is_replica("north")
+
+def test_unreachable_replica_falls_back_to_primary(lag):
+    lag["value"] = OSError("connection refused")
+    assert not _is_replica("north")
+
+def test_school_without_replica_reads_primary(lag):
+    assert not _is_replica("south")
+    assert lag["probes"] == 0
+
+def test_recent_writer_reads_primary(lag):
+    database.note_write("north", "teacher@school.test")
+    assert not _is_replica("north", "teacher@school.test")
+    assert _is_replica("north", "someone-else@school.test")
+
+def test_health_is_cached_between_checks(lag):
+    assert _is_replica("north") and _is_replica("north")
+    assert lag["probes"] == 1
+
+def test_one_probe_at_a_time(monkeypatch):
+    probes = []
+    def slow_probe(replica_engine):
+        probes.append(1)
+        time.sleep(0.3)
+        raise OSError("blackholed")
+    monkeypatch.setattr(database, "replica_lag_seconds", slow_probe)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(database.replica_usable("north"))) for _ in range(10)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(probes) == 1
+    assert results == [False] * 10
+    assert time.monotonic() - started < 1
+
+def test_read_endpoint_reports_the_database_used(client, lag):
+    with database.session_for("north") as db:
+        add_user(db, "admin@school.test", "admin")
+        db.commit()
+    headers = login(client, "admin@school.test")
+    assert client.get("/api/analytics/admin/leaderboard", headers=headers).headers.get("X-Database-Role") == "replica"
+    lag["value"] = OSError("connection refused")
+    database._replica_health.clear()
+    assert client.get("/api/analytics/admin/leaderboard", headers=headers).headers.get("X-Database-Role") == "primary"
@@ -0,0 +1,49 @@
+import io
+import zipfile
+
+import pytest
+
+from backend import crud, models, reports
+from conftest import add_teacher, add_student, add_subject
+
+
+@pytest.fixture
+def class_10a(db):
+    teacher = add_teacher(db, "teacher@school.test")
+    math, art = add_subject(db, "Math", teacher), add_subject(db, "Art", teacher)
+    ann, bob, cat = (add_student(db, f"{name}@school.test") for name in ("ann", "bob", "cat"))
+    add_student(db, "dan@school.test") # no marks yet
+    other = add_student(db, "eve@school.test", class_name="10B")
+    for student, math_marks, art_marks in ((ann, 90, 70), (bob, 70, 90), (cat, 50, 70), (other, 10, 10)):
+        db.add(models.Mark(student_id=student.id, subject_id=math.id, marks=math_marks))
+        db.add(models.Mark(student_id=student.id, subject_id=art.id, marks=art_marks))
+    db.commit()
+
+def _cards_by_roll(db):
+    return {card["roll_number"]: card for card in crud.get_class_report_data(db, "10A")}
+
+
+def test_report_ranks_by_average_with_ties(db, class_10a):
+    cards = _cards_by_roll(db)
+    assert sorted(cards) == ["ANN", "BOB", "CAT", "DAN"]
+    assert [(cards[r]["average_marks"], cards[r]["rank"]) for r in ("ANN", "BOB", "CAT")] == [(80, 1), (80, 1), (60, 3)]
+    assert all(card["class_size"] == 4 and card["class_name"] == "10A" for card in cards.values())
+
+def test_report_subject_averages_cover_the_class_only(db, class_10a):
+    subjects = {s["subject_name"]: s for s in _cards_by_roll(db)["ANN"]["subjects"]}
+    assert subjects["Math"] == {"subject_name": "Math", "marks": 90, "class_average": 70}
+    assert subjects["Art"]["class_average"] == pytest.approx(76.67)
+
+def test_student_without_marks_gets_an_empty_card(db, class_10a):
+    dan = _cards_by_roll(db)["DAN"]
+    assert dan["average_marks"] is None and dan["rank"] is None and dan["subjects"] == []
+
+def test_unknown_class_has_no_cards(db, class_10a):
+    assert crud.get_class_report_data(db, "12Z") == []
+
+def test_report_archive_holds_every_card(db, class_10a):
+    cards = crud.get_class_report_data(db, "10A")
+    archive, summary = reports.build_report_archive(cards, formats=("html",), workers=1)
+    names = zipfile.ZipFile(io.BytesIO(archive)).namelist()
+    assert summary["report_cards"] == 4
+    assert sorted(names) == sorted([f"html/{c['roll_number']}_{c['student_id']}.html" for c in cards] + ["summary.json"])
@@ -0,0 +1,43 @@
+from backend import crud, database, models
+from conftest import add_user, login
+
+
+def _seed_admins():
+    for school in ("north", "south"):
+        with database.session_for(school) as db:
+            add_user(db, "admin@school.test", "admin", name=f"{school} admin")
+            db.commit()
+
+
+def test_sessions_are_bound_to_their_school(db):
+    assert database.school_of(db) == "north"
+    with database.session_for("south") as south:
+        assert database.school_of(south) == "south"
+        assert south.get_bind() is database.engines["south"]
+
+def test_login_token_carries_the_school(client):
+    _seed_admins()
+    headers = login(client, "admin@school.test", school="south")
+    # The signed token decides the school: the header is ignored once authenticated
+    response = client.post("/api/admin/subjects/", json={"name": "Geography"}, headers={**headers, "X-School": "north"})
+    assert response.status_code == 200, response.text
+    with database.session_for("south") as south:
+        assert [s.name for s in crud.admin_get_all_subjects(south)] == ["Geography"]
+    with database.session_for("north") as north:
+        assert crud.admin_get_all_subjects(north) == []
+
+def test_each_school_sees_only_its_own_data(client):
+    _seed_admins()
+    north, south = login(client, "admin@school.test", "north"), login(client, "admin@school.test", "south")
+    client.post("/api/admin/subjects/", json={"name": "Physics"}, headers=north)
+    assert [s["name"] for s in client.get("/api/admin/subjects/", headers=north).json()] == ["Physics"]
+    assert client.get("/api/admin/subjects/", headers=south).json() == []
+
+def test_unknown_school_is_rejected(client):
+    response = client.post("/api/auth/login", data={"username": "x", "password": "y"}, headers={"X-School": "nowhere"})
+    assert response.status_code == 400
+
+def test_scatter_runs_against_every_school():
+    _seed_admins()
+    names = database.scatter(lambda db: db.query(models.User.name).scalar())
+    assert names == {"north": "north admin", "south": "south admin"}
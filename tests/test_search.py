@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import text
+
+from backend import crud, database, main
+from conftest import add_teacher, add_student, add_subject, enroll
+
+
+@pytest.fixture
+def roster(db):
+    teacher = add_teacher(db, "teacher@school.test")
+    other = add_teacher(db, "other@school.test")
+    math, art = add_subject(db, "Math", teacher), add_subject(db, "Art", other)
+    students = {}
+    # email prefix -> (name, subject); the roll number is the upper-cased email prefix
+    for email, name, subject in (
+        ("ann", "Zoe Ward", math),     # roll number is exactly the term
+        ("anna", "Anna Smith", math),  # name, email and roll number start with it
+        ("jo", "Joanna Lee", math),    # contains it
+        ("bel", "Annabel Ng", art),    # matches, but in another teacher's subject
+        ("max", "Max Stone", math),    # does not match
+    ):
+        student = add_student(db, f"{email}@school.test")
+        student.user.name = name
+        enroll(db, student, subject)
+        students[email] = student
+    db.commit()
+    return {"teacher": teacher.user_id, "math": math.id, "art": art.id}
+
+def _search(db, roster, q, **kwargs):
+    return [s.roll_number for s in crud.teacher_search_students(db, roster["teacher"], q, **kwargs)]
+
+
+def test_exact_roll_number_then_prefix_then_substring(db, roster):
+    assert _search(db, roster, "Ann") == ["ANN", "ANNA", "JO"]
+
+def test_short_terms_only_match_prefixes(db, roster):
+    # No exact roll number: both are prefix matches, ordered by name
+    assert _search(db, roster, "an") == ["ANNA", "ANN"]
+
+def test_search_only_covers_the_teachers_own_students(db, roster):
+    assert "BEL" not in _search(db, roster, "annabel")
+    assert _search(db, roster, "ann", subject_id=roster["art"]) == []
+    assert _search(db, roster, "ann", subject_id=roster["math"]) == ["ANN", "ANNA", "JO"]
+
+def test_like_wildcards_are_matched_literally(db, roster):
+    assert _search(db, roster, "%") == [] and _search(db, roster, "a_n") == []
+
+def test_blank_term_and_limit(db, roster):
+    assert _search(db, roster, "   ") == []
+    assert _search(db, roster, "ann", limit=1) == ["ANN"]
+
+
+def test_startup_creates_missing_search_indexes():
+    school_engine = database.engines["north"]
+    with school_engine.begin() as conn:
+        for name in main.UPGRADE_INDEXES:
+            conn.execute(text(f"DROP INDEX {name}"))
+    main._upgrade_indexes(school_engine)
+    main._upgrade_indexes(school_engine) # idempotent
+    with school_engine.connect() as conn:
+        names = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    assert set(main.UPGRADE_INDEXES) <= names
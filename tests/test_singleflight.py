@@ -0,0 +1,54 @@
+import threading
+import time
+
+from backend import crud, database, models, singleflight
+from conftest import add_teacher, add_student, add_subject, enroll, login
+
+REQUESTS = 20
+
+
+def test_concurrent_student_stats_share_one_leaderboard(client, db, monkeypatch):
+    teacher = add_teacher(db, "teacher@school.test")
+    math = add_subject(db, "Math", teacher)
+    student = add_student(db, "student@school.test")
+    enroll(db, student, math)
+    db.add(models.Mark(student_id=student.id, subject_id=math.id, marks=72))
+    db.commit()
+    headers = login(client, "student@school.test")
+
+    # Reads go to the primary so every request lands on the same pool
+    def unreachable(replica_engine):
+        raise OSError("connection refused")
+    monkeypatch.setattr(database, "replica_lag_seconds", unreachable)
+    monkeypatch.setattr(singleflight, "_stats", {})
+
+    # The leader holds its computation open until every request has joined the flight,
+    # then records how many connections the whole crowd has checked out
+    checked_out = []
+    original = crud.get_leaderboard
+    def slow_leaderboard(session):
+        deadline = time.monotonic() + 5
+        while singleflight.stats()["leaderboard"]["calls"] < REQUESTS and time.monotonic() < deadline:
+            time.sleep(0.01)
+        result = original(session)
+        checked_out.append(database.engines["north"].pool.checkedout())
+        return result
+    monkeypatch.setattr(crud, "get_leaderboard", slow_leaderboard)
+
+    responses = []
+    def request():
+        responses.append(client.get("/api/analytics/student/stats", headers=headers))
+    threads = [threading.Thread(target=request) for _ in range(REQUESTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [r.status_code for r in responses] == [200] * REQUESTS
+    assert responses[0].json()["rank"] == 1
+    counters = singleflight.stats()["leaderboard"]
+    assert counters["calls"] == REQUESTS
+    assert counters["executions"] <= 2
+    assert counters["leader_failures"] == 0 and counters["wait_timeouts"] == 0
+    # Only the leader's own session is connected while the others wait
+    assert checked_out[0] == 1
@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy.pool import QueuePool, SingletonThreadPool
+
+from backend import database
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("pragma, expected", [("journal_mode", "wal"), ("foreign_keys", 1), ("synchronous", 1)])
+def test_file_databases_get_the_pragmas(pragma, expected):
+    with database.engines["north"].connect() as conn:
+        assert conn.exec_driver_sql(f"PRAGMA {pragma}").scalar() == expected
+
+def test_file_databases_use_a_queue_pool_with_a_checkout_timeout():
+    pool = database.engines["north"].pool
+    assert isinstance(pool, QueuePool) and pool._timeout == database.DB_POOL_TIMEOUT_SECONDS
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:"])
+def test_in_memory_database(url):
+    memory_engine = database.make_engine(url)
+    assert isinstance(memory_engine.pool, SingletonThreadPool)
+    with memory_engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+
+def test_app_imports_with_an_in_memory_database():
+    env = {k: v for k, v in os.environ.items() if k not in ("SCHOOL_DATABASES", "SCHOOL_REPLICAS", "DEFAULT_SCHOOL")}
+    env["DATABASE_URL"] = "sqlite://"
+    result = subprocess.run([sys.executable, "-c", "import backend.database"], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr